@@ -88,7 +88,8 @@ DATABASES = {
     #     'NAME': BASE_DIR / 'db.sqlite3',
     # }
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # django.db.backends.mysql 加上连接健康检查和可选的连接池，见 utils.db.base
+        'ENGINE': 'utils.db.mysql',
         'NAME': 'mxshop',
         'USER': 'root',
         'PASSWORD': '123456',
@@ -98,7 +99,28 @@ DATABASES = {
             # 这里引擎用innodb（默认myisam）
             # 因为后面第三方登录时，要求引擎为INNODB
             'init_command': 'SET default_storage_engine=INNODB;'
-        }
+        },
+        # 持久连接：连接保留 60 秒供同一线程的后续请求复用，不必每个请求重新建立 TCP 连接和认证；
+        # 需小于 MySQL 的 wait_timeout
+        'CONN_MAX_AGE': 60,
+        # 每个请求第一次使用复用的连接前先检查，已断开则重新连接
+        'CONN_HEALTH_CHECKS': True,
+        # 进程内连接池（可选），ASGI 部署或线程数多于所需连接数时使用，启用时 CONN_MAX_AGE 设为 0：
+        # 'POOL': {
+        #     'SIZE': 10,  # 保留的空闲连接数
+        #     'MAX_OVERFLOW': 10,  # 高峰时额外创建的连接数
+        #     'TIMEOUT': 30,  # 等待空闲连接的秒数
+        #     'RECYCLE': 3600,  # 连接最长使用秒数，需小于 wait_timeout
+        # },
+    }
+}
+
+# 缓存：redis（Django 自带的 RedisCache 后端，需安装 redis）
+# 分类树、首页片段、购物车、验证码等的失效和读写需要在所有进程间可见，不能使用 LocMemCache 等进程内缓存
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
     }
 }
 
@@ -120,6 +142,37 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# 密码哈希策略：scrypt / argon2（需安装 argon2-cffi）/ pbkdf2
+# 新密码用所选策略，其余哈希只用于校验旧密码，登录成功时自动升级为所选策略和参数
+# 参数决定每次登录、注册的 CPU 和内存开销，调整前用 manage.py bench_password_hashers 测试
+PASSWORD_HASH_POLICY = 'scrypt'
+PASSWORD_HASH_COST = {
+    # work_factor（N）× block_size（r）× 128 字节 = 16MB 内存
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    # memory_cost 单位 KB
+    'argon2': {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1},
+    'pbkdf2': {'iterations': 320000},
+}
+PASSWORD_HASH_POLICIES = {
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'users.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASH_POLICIES[PASSWORD_HASH_POLICY]] + [
+    hasher for policy, hasher in PASSWORD_HASH_POLICIES.items() if policy != PASSWORD_HASH_POLICY
+] + [
+    # 兼容更早的哈希
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# 异步视图（登录、注册）中计算密码哈希的线程数，一般与 CPU 核数相同
+PASSWORD_HASH_WORKERS = os.cpu_count() or 1
+
+# 登录、注册、发送验证码使用异步视图（ASGI 部署时哈希和短信发送不占用请求线程），
+# False 时使用 DRF 的同步视图
+ASYNC_AUTH_VIEWS = True
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -155,13 +208,23 @@ REST_FRAMEWORK = {
     # 每页显示的个数
     'PAGE_SIZE': 10,
 
-    # JWT
+    # 渲染：JSON 用 orjson 编码（未安装时退回标准库 json）
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+
+    # 认证：按顺序尝试，带 Authorization 头的 JWT 请求在第一个认证类完成，不再读取 session；
+    # 不使用 BasicAuthentication（每个请求都要计算一次密码哈希）
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.BasicAuthentication',
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
 
+    # 请求方 IP（限流）：反向代理的层数，部署在 nginx 之后设为 1，从 X-Forwarded-For 读取；
+    # 为 0 时使用 REMOTE_ADDR（None 时信任整个 X-Forwarded-For，可被客户端伪造）
+    'NUM_PROXIES': 0,
+
     # docs 文档相关
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.AutoSchema"
 }
@@ -177,8 +240,53 @@ JWT_AUTH = {
     'JWT_AUTH_HEADER_PREFIX': 'JWT',  # JWT跟前端保持一致，比如“token”这里设置成JWT
 }
 
+# JWT 认证缓存用户的时间（秒），用户保存、删除时清除；缓存不在进程间共享时不缓存
+JWT_USER_CACHE_TIMEOUT = 300
+
 # 手机号码正则表达式
 REGEX_MOBILE = "^1[358]\d{9}$|^147\d{8}$|^176\d{8}$"
 
 # 云片网 APIKEY，注册成功后在控制台可查看
 APIKEY = "f84c2dc13c55xxxxx6e783ba65ab"
+
+# 发送验证码限流：每个手机号的最小间隔（秒），每个 IP (次数, 窗口秒数)
+SMS_RATE_LIMITS = {
+    'mobile_interval': 60,
+    'ip': (20, 60 * 60),
+}
+
+# 短信发送通道，本地调试可使用 utils.sms.StubTransport
+SMS_TRANSPORT = 'utils.sms.YunPianTransport'
+
+# 短信后台发送队列：并发数、临时错误重试次数、退避基数（秒）
+SMS_DISPATCHER = {
+    'max_workers': 4,
+    'max_retries': 3,
+    'backoff': 0.5,
+}
+
+# 订单支付期限，超时未支付的订单关闭
+ORDER_PAY_TIMEOUT = datetime.timedelta(minutes=30)
+
+# 订单号生成器，worker id 在所有进程、机器间需各不相同：
+# None 表示每个进程从共享缓存租用（见 utils.order_sn.WorkerIdLease），也可为每个进程单独配置
+ORDER_SN_GENERATOR = 'utils.order_sn.SnowflakeGenerator'
+ORDER_SN_WORKER_ID = None
+
+# 购物车存储后端：DatabaseCartStore 直接读写数据库（一次加购一条原子 UPDATE / INSERT）；
+# CacheCartStore 读写缓存、定期批量写回数据库，需要 redis 等共享缓存，配置为进程内缓存时启动报错
+CART_STORE = {
+    'BACKEND': 'trade.cart.DatabaseCartStore',
+    # CacheCartStore 的参数
+    # 'OPTIONS': {
+    #     'flush_interval': 2,  # 写回数据库的间隔（秒）
+    # },
+}
+
+# 商品点击数、收藏数缓冲累加，定期批量写入数据库
+GOODS_COUNTER = {
+    # 写入间隔（秒）
+    'flush_interval': 5,
+    # 每条 UPDATE 包含的商品数
+    'batch_size': 500,
+}
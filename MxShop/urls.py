@@ -14,6 +14,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include, re_path
 from django.views.static import serve
 from rest_framework.documentation import include_docs_urls
@@ -21,14 +22,17 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from MxShop.settings import MEDIA_ROOT
-from goods.views import GoodsListViewSet
+from goods.views import GoodsListViewSet, CategoryViewSet, IndexViewSet
 from trade.views import ShoppingCartViewSet, OrderViewSet
 from user_operation.views import UserFavViewSet, UserLeavingMessageViewSet, UserAddressViewSet
-from users.views import SmsCodeViewSet, UserCreateViewSet
+from users.views import SmsCodeViewSet, UserCreateViewSet, login, register, send_sms_code
+from utils.db.views import db_status
 
 router = DefaultRouter()
 
 router.register(r'goods', GoodsListViewSet, basename='goods')
+router.register(r'categorys', CategoryViewSet, basename='categorys')   # 商品分类树
+router.register(r'index', IndexViewSet, basename='index')   # 首页数据
 router.register(r'code', SmsCodeViewSet, basename="code")   # 短信验证码
 router.register(r'users', UserCreateViewSet, basename='users')   # 注册
 router.register(r'userfavs', UserFavViewSet, basename='userfavs')   # 用户商品收藏
@@ -47,5 +51,16 @@ urlpatterns = [
     path('docs', include_docs_urls(title='hubery')),
     path('api-auth/', include('rest_framework.urls')),
 
+    # 数据库连接状态、连接池指标（管理员）
+    path('health/db/', db_status, name='db_status'),
+
     re_path('^', include(router.urls)),
 ]
+
+if settings.ASYNC_AUTH_VIEWS:
+    # 登录、注册、发送验证码使用异步视图，放在 router 之前，替换 login/ 和 users/、code/ 的 POST
+    urlpatterns[:0] = [
+        path('login/', login, name='token_obtain_pair'),
+        path('users/', register, name='users-register'),
+        path('code/', send_sms_code, name='code-send'),
+    ]
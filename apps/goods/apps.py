@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GoodsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'goods'
+
+    def ready(self):
+        # 注册缓存失效的信号
+        import goods.signals  # noqa: F401
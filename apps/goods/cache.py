@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from goods.models import GoodsCategory, Goods, GoodsImage, Banner, IndexAd, HotSearchWords
+from goods.serializers import CategorySerializer, GoodsListSerializer, BannerSerializer, HotWordsSerializer
+
+# 分类树缓存 key，分类变更时由 signals 删除
+CATEGORY_TREE_CACHE_KEY = 'goods:category_tree'
+
+# 分类树缓存秒数：signals 覆盖不到的变更（queryset.update、直接改库）最多这么久后生效
+CATEGORY_TREE_TIMEOUT = 60 * 10
+
+# 首页片段缓存 key
+INDEX_FRAGMENT_CACHE_KEY = 'goods:index:{name}'
+
+# 首页新品、热销商品展示个数
+INDEX_GOODS_LIMIT = 10
+
+
+def build_category_tree():
+    """
+    一次查询取出全部类目，在内存中按 parent_category 组装成三级类目树
+    :return: 一级类目列表，每个节点的 sub_cat 为其子类目
+    """
+    categories = GoodsCategory.objects.all().order_by('id')
+    nodes = [dict(item, sub_cat=[]) for item in CategorySerializer(categories, many=True).data]
+    node_map = {node['id']: node for node in nodes}
+
+    tree = []
+    for node in nodes:
+        parent = node_map.get(node['parent_category'])
+        if parent is None:
+            tree.append(node)
+        else:
+            parent['sub_cat'].append(node)
+    return tree
+
+
+def get_category_tree():
+    """获取分类树，缓存未命中时重建"""
+    tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, timeout=CATEGORY_TREE_TIMEOUT)
+    return tree
+
+
+def invalidate_category_tree():
+    """事务提交后清除分类树缓存，避免提交前被其他请求以旧数据重新缓存"""
+    transaction.on_commit(lambda: cache.delete(CATEGORY_TREE_CACHE_KEY))
+
+
+def build_banners():
+    """首页轮播图，按轮播顺序排列"""
+    return BannerSerializer(Banner.objects.all().order_by('index'), many=True).data
+
+
+def build_hot_words():
+    """热搜词，按排序值倒序"""
+    return HotWordsSerializer(HotSearchWords.objects.all().order_by('-index'), many=True).data
+
+
+def build_index_ads():
+    """首页广告，按类目分组"""
+    ads = list(IndexAd.objects.select_related('category', 'goods__category')
+               .prefetch_related('goods__images').defer('goods__goods_desc').order_by('id'))
+    goods_data = GoodsListSerializer([ad.goods for ad in ads], many=True).data
+
+    groups = {}
+    for ad, goods in zip(ads, goods_data):
+        group = groups.setdefault(ad.category_id, {
+            'category': {'id': ad.category_id, 'name': ad.category.name},
+            'goods': [],
+        })
+        group['goods'].append(goods)
+    return list(groups.values())
+
+
+def build_new_goods():
+    """首页新品"""
+    queryset = Goods.objects.summary().filter(is_new=True).order_by('-add_time')[:INDEX_GOODS_LIMIT]
+    return GoodsListSerializer(queryset, many=True).data
+
+
+def build_hot_goods():
+    """热销商品"""
+    queryset = Goods.objects.summary().filter(is_hot=True).order_by('-sold_num')[:INDEX_GOODS_LIMIT]
+    return GoodsListSerializer(queryset, many=True).data
+
+
+# 首页片段：名称 -> (构建函数, 缓存秒数, 变更时需要失效该片段的模型)
+INDEX_FRAGMENTS = {
+    'banners': (build_banners, 60 * 30, (Banner,)),
+    'hot_words': (build_hot_words, 60 * 10, (HotSearchWords,)),
+    'index_ads': (build_index_ads, 60 * 30, (IndexAd, Goods, GoodsImage, GoodsCategory)),
+    'new_goods': (build_new_goods, 60 * 5, (Goods, GoodsImage, GoodsCategory)),
+    'hot_goods': (build_hot_goods, 60 * 5, (Goods, GoodsImage, GoodsCategory)),
+}
+
+
+def get_index_data():
+    """
+    获取首页数据，各片段分别缓存
+    :return: (首页数据, 各片段缓存状态 hit/miss)
+    """
+    keys = {name: INDEX_FRAGMENT_CACHE_KEY.format(name=name) for name in INDEX_FRAGMENTS}
+    cached = cache.get_many(keys.values())
+
+    data, cache_status = {}, {}
+    for name, (builder, timeout, _) in INDEX_FRAGMENTS.items():
+        key = keys[name]
+        if key in cached:
+            data[name] = cached[key]
+            cache_status[name] = 'hit'
+        else:
+            data[name] = builder()
+            cache.set(key, data[name], timeout=timeout)
+            cache_status[name] = 'miss'
+    return data, cache_status
+
+
+def invalidate_index_fragments(model):
+    """事务提交后清除依赖 model 的首页片段缓存"""
+    keys = [INDEX_FRAGMENT_CACHE_KEY.format(name=name)
+            for name, (_, _, models) in INDEX_FRAGMENTS.items() if model in models]
+    transaction.on_commit(lambda: cache.delete_many(keys))
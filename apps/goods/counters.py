@@ -0,0 +1,108 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Case, When, Value
+
+from goods.models import Goods
+from utils.conditional import touch
+from utils.singleton import per_process
+
+logger = logging.getLogger(__name__)
+
+
+class GoodsCounter:
+    """
+    商品计数（点击数、收藏数等）缓冲累加：
+    increment 只在进程内存中累加增量，后台线程每隔 flush_interval 秒把同一批商品的增量
+    合并成一条 UPDATE ... SET field = field + CASE id WHEN ... END 写入数据库，
+    避免热门商品的行锁竞争
+    读取时用 merge 把数据库中的值加上本进程尚未写入的增量
+    """
+    FIELDS = ('click_num', 'fav_num', 'sold_num')
+
+    def __init__(self, flush_interval=5, batch_size=500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # {goods_id: {field: delta}}
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def increment(self, goods_id, field, delta=1):
+        if field not in self.FIELDS:
+            raise ValueError(f'不支持的计数字段：{field}')
+        with self._lock:
+            self._pending[goods_id][field] += delta
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='goods-counter', daemon=True)
+                self._flusher.start()
+
+    def pending(self, goods_id, field):
+        """尚未写入数据库的增量"""
+        with self._lock:
+            counts = self._pending.get(goods_id)
+            return counts.get(field, 0) if counts else 0
+
+    def merge(self, data):
+        """序列化后的商品数据加上未写入的增量"""
+        with self._lock:
+            counts = self._pending.get(data.get('id'))
+            if counts:
+                for field, delta in counts.items():
+                    if field in data:
+                        data[field] += delta
+        return data
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('商品计数写入失败')
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        写入累积的增量，每 batch_size 个商品一条 UPDATE
+        :return: 写入的商品数
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+        goods_ids = list(pending)
+
+        for i in range(0, len(goods_ids), self.batch_size):
+            batch = goods_ids[i:i + self.batch_size]
+            updates = {}
+            for field in self.FIELDS:
+                whens = [When(id=goods_id, then=Value(pending[goods_id][field]))
+                         for goods_id in batch if pending[goods_id].get(field)]
+                if whens:
+                    updates[field] = F(field) + Case(*whens, default=Value(0))
+            try:
+                Goods.objects.filter(id__in=batch).update(**updates)
+            except Exception:
+                # 写入失败，增量放回缓冲区，下次重试
+                with self._lock:
+                    for goods_id in goods_ids[i:]:
+                        for field, delta in pending[goods_id].items():
+                            self._pending[goods_id][field] += delta
+                raise
+        if goods_ids:
+            touch(Goods)
+        return len(goods_ids)
+
+
+@per_process(settings=('GOODS_COUNTER',))
+def get_goods_counter():
+    """获取当前进程的商品计数器"""
+    counter = GoodsCounter(**settings.GOODS_COUNTER)
+    # 进程退出前写入未同步的增量
+    atexit.register(counter.flush)
+    return counter
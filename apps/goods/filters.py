@@ -1,6 +1,10 @@
 import django_filters
+from django.db.models import Case, When
+from django.template import loader
+from rest_framework.filters import SearchFilter
 
 from .models import Goods
+from .search import search
 
 
 class GoodsFilter(django_filters.rest_framework.FilterSet):
@@ -14,3 +18,28 @@ class GoodsFilter(django_filters.rest_framework.FilterSet):
     class Meta:
         model = Goods
         fields = ['price_min', 'price_max', 'is_hot']
+
+
+class GoodsSearchFilter(SearchFilter):
+    """
+    商品搜索：查询倒排索引（goods.search），按相关度排序，替代 LIKE '%term%' 全表扫描
+    搜索的字段由索引决定（goods.search.SEARCH_FIELDS），视图不需要 search_fields
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        keywords = request.query_params.get(self.search_param, '').strip()
+        if not keywords:
+            return queryset
+
+        goods_ids = search(keywords)
+        if not goods_ids:
+            return queryset.none()
+
+        # 保持相关度顺序
+        ranking = Case(*[When(id=goods_id, then=position) for position, goods_id in enumerate(goods_ids)])
+        return queryset.filter(id__in=goods_ids).order_by(ranking)
+
+    def to_html(self, request, queryset, view):
+        # 可浏览 API 的搜索框，SearchFilter 只在视图定义了 search_fields 时显示
+        context = {'param': self.search_param, 'term': request.query_params.get(self.search_param, '')}
+        return loader.get_template(self.template).render(context)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+
+from goods.counters import GoodsCounter
+from goods.models import Goods, GoodsCategory
+
+
+class Command(BaseCommand):
+    help = ('热门商品计数压测：多个线程同时给同一个商品的点击数 + 1，'
+            '对比每次直接 UPDATE 与 GoodsCounter 缓冲累加；测试商品结束后删除')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+        parser.add_argument('--increments', type=int, default=200, help='每个线程的累加次数')
+
+    def handle(self, *args, **options):
+        threads, increments = options['threads'], options['increments']
+        # 各线程使用自己的数据库连接，测试商品需要提交后才能被其他连接看到
+        category = GoodsCategory.objects.create(name='bench', category_type=1)
+        goods = Goods.objects.create(name='bench', goods_brief='', goods_desc='', category=category)
+        try:
+            def direct_update():
+                Goods.objects.filter(id=goods.id).update(click_num=F('click_num') + 1)
+
+            elapsed = self.run_threads(direct_update, threads, increments)
+            self.report('直接 UPDATE', threads * increments, elapsed)
+
+            # 不启动定时写入，压测结束后一次写入
+            counter = GoodsCounter(flush_interval=3600)
+            elapsed = self.run_threads(lambda: counter.increment(goods.id, 'click_num'), threads, increments)
+            self.report('GoodsCounter', threads * increments, elapsed)
+
+            start = time.perf_counter()
+            counter.flush()
+            self.stdout.write(f'写入 1 个商品的累计增量 {(time.perf_counter() - start) * 1000:.2f} ms')
+
+            goods.refresh_from_db()
+            expected = threads * increments * 2
+            if goods.click_num != expected:
+                self.stderr.write(f'点击数 {goods.click_num}，预期 {expected}')
+        finally:
+            goods.delete()
+            category.delete()
+
+    def run_threads(self, target, threads, increments):
+        """所有线程就绪后同时开始，返回全部完成的耗时"""
+        barrier = threading.Barrier(threads + 1)
+
+        def run():
+            try:
+                barrier.wait()
+                for _ in range(increments):
+                    target()
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - start
+
+    def report(self, name, total, elapsed):
+        self.stdout.write(f'{name:<12} {total} 次 {elapsed:8.3f}s {total / elapsed:12.1f} 次/s')
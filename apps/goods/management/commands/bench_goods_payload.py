@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from goods.models import Goods, GoodsCategory
+from goods.serializers import GoodsSerializer, GoodsListSerializer
+from utils.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = ('商品列表每页的响应大小与序列化耗时：完整序列化（GoodsSerializer，含 goods_desc）'
+            '与精简序列化（GoodsListSerializer，不读取 goods_desc）；商品不足一页时在事务中补足测试商品，结束后回滚')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10, help='每页商品数')
+        parser.add_argument('--desc-bytes', type=int, default=20000, help='测试商品详情（goods_desc）的大小')
+        parser.add_argument('--requests', type=int, default=50, help='每种情况的重复次数')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        renderer = FastJSONRenderer()
+
+        with transaction.atomic():
+            missing = page_size - Goods.objects.count()
+            if missing > 0:
+                category = GoodsCategory.objects.create(name='bench', category_type=1)
+                desc = '<p>' + 'x' * options['desc_bytes'] + '</p>'
+                Goods.objects.bulk_create([Goods(name=f'bench{i}', goods_brief='', goods_desc=desc, category=category)
+                                           for i in range(missing)])
+
+            cases = (
+                ('GoodsSerializer', GoodsSerializer, Goods.objects.with_related()),
+                ('GoodsListSerializer', GoodsListSerializer, Goods.objects.summary()),
+            )
+            for name, serializer_class, queryset in cases:
+                queries = 0
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    with CaptureQueriesContext(connection) as ctx:
+                        data = serializer_class(queryset.order_by('-add_time', '-id')[:page_size], many=True).data
+                    queries += len(ctx)
+                    payload = renderer.render(data)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{name:<20} {len(payload):10d} 字节/页 '
+                                  f'{elapsed / options["requests"] * 1000:8.2f} ms/页 '
+                                  f'{queries / options["requests"]:.1f} 条 SQL/页')
+            transaction.set_rollback(True)
@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import mixins
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from goods.models import Goods, GoodsCategory, GoodsImage, with_goods_related
+from goods.views import GoodsListViewSet
+from trade.models import OrderInfo, ShoppingCart
+from trade.views import ShoppingCartViewSet, OrderViewSet
+from user_operation.models import UserFav
+from user_operation.views import UserFavViewSet
+
+User = get_user_model()
+
+
+def drf_viewset(viewset, **attrs):
+    """list 改回 DRF 的 ListModelMixin.list，逐行实例化模型和序列化器"""
+    return type(f'Drf{viewset.__name__}', (viewset,), {'list': mixins.ListModelMixin.list, **attrs})
+
+
+class Command(BaseCommand):
+    help = ('列表接口的快速序列化（ValuesSerializer）与 DRF 序列化器的对比：每秒请求数、每行 CPU 时间，'
+            '并校验两者输出的 JSON 完全一致；测试数据在事务中创建，结束后回滚')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10, help='测试用户的收藏、购物车、订单记录数')
+        parser.add_argument('--requests', type=int, default=200, help='每种情况的请求次数')
+
+    def handle(self, *args, **options):
+        # 默认的 testserver 不在 ALLOWED_HOSTS 中，DEBUG 下 localhost 总是允许
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+
+        with transaction.atomic():
+            user = self.create_data(options['rows'])
+            drf_cart = drf_viewset(
+                ShoppingCartViewSet,
+                get_queryset=lambda view: with_goods_related(ShoppingCart.objects.filter(user=view.request.user))
+                .order_by('id'),
+            )
+            cases = (
+                ('商品列表', '/goods/', GoodsListViewSet, drf_viewset(GoodsListViewSet)),
+                ('收藏列表', '/userfavs/', UserFavViewSet, drf_viewset(UserFavViewSet)),
+                ('购物车', '/shopcarts/', ShoppingCartViewSet, drf_cart),
+                ('订单列表', '/orders/', OrderViewSet, drf_viewset(OrderViewSet)),
+            )
+            for name, url, fast_viewset, drf in cases:
+                contents = []
+                for label, viewset in (('ValuesSerializer', fast_viewset), ('DRF', drf)):
+                    view = viewset.as_view({'get': 'list'})
+                    rows = 0
+                    start, cpu_start = time.perf_counter(), time.process_time()
+                    for _ in range(options['requests']):
+                        request = factory.get(url, HTTP_ACCEPT='application/json')
+                        force_authenticate(request, user)
+                        response = view(request).render()
+                        rows += len(response.data['results'])
+                    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+                    contents.append(response.content)
+                    self.stdout.write(f'{name} {label:<16} {options["requests"] / elapsed:8.1f} 次/s '
+                                      f'{cpu / max(rows, 1) * 1e6:8.1f} µs CPU/行')
+                if contents[0] != contents[1]:
+                    self.stderr.write(f'{name}：两种序列化的输出不一致')
+            transaction.set_rollback(True)
+
+    def create_data(self, rows):
+        """测试用户，以及 rows 个商品（各两张轮播图）的收藏、购物车记录和 rows 个订单"""
+        user = User.objects.create_user(username='bench_list_user', password='bench-password-123')
+        category = GoodsCategory.objects.create(name='bench', category_type=1)
+        Goods.objects.bulk_create([Goods(name=f'bench{i}', goods_brief='', goods_desc='', category=category)
+                                   for i in range(rows)])
+        # MySQL 的 bulk_create 不返回主键，重新查询
+        goods = list(Goods.objects.filter(category=category))
+        GoodsImage.objects.bulk_create([GoodsImage(goods=item, image=f'goods/bench-{item.id}-{j}.png')
+                                        for item in goods for j in range(2)])
+        UserFav.objects.bulk_create([UserFav(user=user, goods=item) for item in goods])
+        ShoppingCart.objects.bulk_create([ShoppingCart(user=user, goods=item, nums=1) for item in goods])
+        OrderInfo.objects.bulk_create([OrderInfo(user=user, order_sn=f'bench{i}', post_script='', singer_mobile='')
+                                       for i in range(rows)])
+        return user
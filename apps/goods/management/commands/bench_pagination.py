@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import Cursor
+
+from goods.models import Goods, GoodsCategory
+from goods.views import GoodsListViewSet
+from utils.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    help = ('商品列表第 1 页与第 N 页的耗时：页码分页（?page=，OFFSET）与游标分页（?cursor=），'
+            '测试商品在事务中批量创建，结束后回滚')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=1000, help='对比的深页页码')
+        parser.add_argument('--requests', type=int, default=20, help='每种情况的请求次数')
+
+    def handle(self, *args, **options):
+        view = GoodsListViewSet.as_view({'get': 'list'})
+        # 默认的 testserver 不在 ALLOWED_HOSTS 中，DEBUG 下 localhost 总是允许
+        factory = RequestFactory(SERVER_NAME='localhost')
+        paginator = KeysetPagination()
+        page_size = paginator.page_size
+
+        with transaction.atomic():
+            # 补足到第 page 页还有数据
+            total = page_size * options['page']
+            missing = total - Goods.objects.count()
+            if missing > 0:
+                category = GoodsCategory.objects.create(name='bench', category_type=1)
+                Goods.objects.bulk_create([Goods(name=f'bench{i}', goods_brief='', goods_desc='', category=category)
+                                           for i in range(missing)], batch_size=1000)
+
+            # 第 page 页的游标：前一页最后一条记录的位置
+            paginator.base_url = 'http://localhost/goods/'
+            offset = page_size * (options['page'] - 1)
+            last = Goods.objects.order_by(*paginator.ordering).values('add_time', 'id')[offset - 1]
+            cursor = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=paginator.get_position(last)))
+
+            cases = (
+                ('页码分页 第 1 页', '/goods/?page=1'),
+                (f'页码分页 第 {options["page"]} 页', f'/goods/?page={options["page"]}'),
+                ('游标分页 第 1 页', '/goods/'),
+                (f'游标分页 第 {options["page"]} 页', cursor),
+                (f'游标分页 第 {options["page"]} 页 count=0', f'{cursor}&count=0'),
+            )
+            for name, url in cases:
+                queries = 0
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = view(factory.get(url, HTTP_ACCEPT='application/json'))
+                    queries += len(ctx)
+                    if response.status_code != 200:
+                        self.stderr.write(f'{name}：状态码 {response.status_code}')
+                        break
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{name:<24} {elapsed / options["requests"] * 1000:8.2f} ms/次 '
+                                  f'{queries / options["requests"]:.1f} 条 SQL/次')
+            transaction.set_rollback(True)
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from goods.models import Goods, GoodsSearchTerm
+from trade.models import OrderInfo, ShoppingCart
+from user_operation.models import UserFav
+from users.models import UserProfile, VerifyCode
+
+
+def hot_queries():
+    """热点接口的典型查询：(名称, queryset)"""
+    one_min_ago = timezone.now() - timedelta(minutes=1)
+    return [
+        ('商品列表（上架时间）', Goods.objects.order_by('-add_time', '-id')[:11]),
+        ('商品列表（销量）', Goods.objects.order_by('-sold_num', '-id')[:11]),
+        ('商品详情', Goods.objects.filter(pk=1)),
+        ('商品价格区间', Goods.objects.filter(shop_price__gte=10, shop_price__lte=100)),
+        ('热销商品价格区间', Goods.objects.filter(is_hot=True, shop_price__lte=100)),
+        ('首页新品', Goods.objects.filter(is_new=True).order_by('-add_time')[:10]),
+        ('首页热销', Goods.objects.filter(is_hot=True).order_by('-sold_num')[:10]),
+        ('商品搜索', GoodsSearchTerm.objects.filter(term__in=['苹果', '果'])),
+        ('手机号登录', UserProfile.objects.filter(mobile='13800000000')),
+        ('验证码频率校验', VerifyCode.objects.filter(mobile='13800000000', add_time__gt=one_min_ago)),
+        ('个人订单列表', OrderInfo.objects.filter(user_id=1).order_by('-add_time', '-id')[:11]),
+        ('订单详情', OrderInfo.objects.filter(user_id=1, pk=1)),
+        ('购物车', ShoppingCart.objects.filter(user_id=1).order_by('id')),
+        ('购物车商品', ShoppingCart.objects.filter(user_id=1, goods_id=1)),
+        ('个人收藏列表', UserFav.objects.filter(user_id=1).order_by('-add_time', '-id')[:11]),
+    ]
+
+
+def explain(queryset):
+    """
+    返回 (执行计划文本, 是否全表扫描)
+    MySQL：EXPLAIN 中 type 为 ALL；SQLite：EXPLAIN QUERY PLAN 中出现不走索引的 SCAN
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            plan = '; '.join(f"{row['table']}: type={row['type']} key={row['key']}" for row in rows)
+            full_scan = any(row['type'] == 'ALL' for row in rows)
+        elif connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            plan = '; '.join(details)
+            full_scan = any(detail.startswith('SCAN') and 'USING' not in detail for detail in details)
+        else:
+            raise CommandError(f'不支持的数据库：{connection.vendor}')
+    return plan, full_scan
+
+
+class Command(BaseCommand):
+    help = '输出热点接口查询的执行计划，出现全表扫描时返回非零状态（表数据过少时优化器可能仍选择全表扫描）'
+
+    def handle(self, *args, **options):
+        full_scans = []
+        for name, queryset in hot_queries():
+            plan, full_scan = explain(queryset)
+            style = self.style.ERROR if full_scan else self.style.SUCCESS
+            self.stdout.write(style(f'{name}: {plan}'))
+            if full_scan:
+                full_scans.append(name)
+
+        if full_scans:
+            raise CommandError(f'以下查询为全表扫描：{"、".join(full_scans)}')
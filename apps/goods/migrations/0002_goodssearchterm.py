@@ -0,0 +1,28 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoodsSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=30, verbose_name='词项')),
+                ('weight', models.FloatField(default=0, verbose_name='权重')),
+                ('goods', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='goods.goods', verbose_name='商品')),
+            ],
+            options={
+                'verbose_name': '商品搜索索引',
+                'verbose_name_plural': '商品搜索索引',
+                'unique_together': {('term', 'goods')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0002_goodssearchterm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['add_time', 'id'], name='goods_add_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['sold_num', 'id'], name='goods_sold_num_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['shop_price'], name='goods_shop_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['is_hot', 'shop_price'], name='goods_hot_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['is_new', 'add_time'], name='goods_new_add_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goods',
+            index=models.Index(fields=['is_hot', 'sold_num'], name='goods_hot_sold_num_idx'),
+        ),
+    ]
@@ -50,6 +50,35 @@ class GoodsCategoryBrand(models.Model):
         return self.name
 
 
+class GoodsQuerySet(models.QuerySet):
+    """商品查询集"""
+
+    def with_related(self):
+        """
+        预取商品序列化时嵌套的分类（外键）和轮播图（反向外键），避免 N+1 查询
+        :return:
+        """
+        return self.select_related('category').prefetch_related('images')
+
+    def summary(self):
+        """
+        列表、嵌套展示用：在 with_related 基础上不读取商品详情（goods_desc 富文本）
+        :return:
+        """
+        return self.with_related().defer('goods_desc')
+
+
+def with_goods_related(queryset, lookup='goods'):
+    """
+    嵌套了商品序列化的查询集（购物车、收藏等）预取商品分类和轮播图，不读取商品详情
+    :param queryset: 通过外键 lookup 指向 Goods 的查询集
+    :param lookup: 指向 Goods 的外键名
+    :return:
+    """
+    return queryset.select_related(f'{lookup}__category').prefetch_related(f'{lookup}__images') \
+        .defer(f'{lookup}__goods_desc')
+
+
 class Goods(models.Model):
     """商品"""
     goods_sn = models.CharField('商品唯一货号', max_length=50, default='')
@@ -76,9 +105,22 @@ class Goods(models.Model):
 
     category = models.ForeignKey(GoodsCategory, on_delete=models.CASCADE, verbose_name='商品类目')
 
+    objects = GoodsQuerySet.as_manager()
+
     class Meta:
         verbose_name = '商品'
         verbose_name_plural = verbose_name
+        indexes = [
+            # 列表默认排序、按销量排序（游标分页按 (字段, id) 定位）
+            models.Index(fields=['add_time', 'id'], name='goods_add_time_idx'),
+            models.Index(fields=['sold_num', 'id'], name='goods_sold_num_idx'),
+            # 价格区间过滤、热销 + 价格过滤
+            models.Index(fields=['shop_price'], name='goods_shop_price_idx'),
+            models.Index(fields=['is_hot', 'shop_price'], name='goods_hot_price_idx'),
+            # 首页新品、热销商品
+            models.Index(fields=['is_new', 'add_time'], name='goods_new_add_time_idx'),
+            models.Index(fields=['is_hot', 'sold_num'], name='goods_hot_sold_num_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -142,3 +184,19 @@ class HotSearchWords(models.Model):
 
     def __str__(self):
         return self.keywords
+
+
+class GoodsSearchTerm(models.Model):
+    """商品搜索倒排索引：词项 -> 商品，由 goods.search 维护"""
+    term = models.CharField('词项', max_length=30)
+    weight = models.FloatField('权重', default=0)
+
+    goods = models.ForeignKey(Goods, on_delete=models.CASCADE, verbose_name='商品', related_name='search_terms')
+
+    class Meta:
+        verbose_name = '商品搜索索引'
+        verbose_name_plural = verbose_name
+        unique_together = ('term', 'goods')
+
+    def __str__(self):
+        return self.term
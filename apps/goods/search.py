@@ -0,0 +1,171 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from goods.models import Goods, GoodsSearchTerm
+from utils.conditional import touch
+
+# 参与索引的字段及权重，商品名命中比描述更相关
+SEARCH_FIELDS = (
+    ('name', 3.0),
+    ('goods_brief', 2.0),
+    ('goods_desc', 1.0),
+)
+
+# 词频饱和参数（BM25 的 k1），同一个词重复出现多次，权重增长逐渐变缓
+TERM_SATURATION = 1.2
+
+# 搜索最多返回的商品数
+MAX_RESULTS = 1000
+
+# 中日韩字符连续片段、其他字母数字连续片段
+CJK_RE = re.compile(r'[㐀-鿿豈-﫿]+')
+WORD_RE = re.compile(r'[^\W_]+')
+
+TERM_MAX_LENGTH = GoodsSearchTerm._meta.get_field('term').max_length
+
+# 商品总数（计算 idf 用）缓存 key 和秒数，商品新增、删除和重建索引后清除
+DOCUMENT_COUNT_CACHE_KEY = 'goods:search:document_count'
+DOCUMENT_COUNT_TIMEOUT = 60 * 10
+
+
+def tokenize(text):
+    """
+    分词：中文按单字 + 二元组（bigram）切分，其他文字按单词切分并转小写
+    :param text:
+    :return: 词项列表（可重复）
+    """
+    tokens = []
+    for chunk in CJK_RE.split(text):
+        tokens.extend(word.lower()[:TERM_MAX_LENGTH] for word in WORD_RE.findall(chunk))
+    for run in CJK_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def tokenize_query(text):
+    """
+    搜索词分词：两个字以上的中文片段只用二元组查询，单字的倒排记录与商品总数同量级，
+    且会匹配到只含其中一个字的商品（搜“苹果”匹配“芒果”）；只有一个字的片段才按单字查询
+    :param text:
+    :return: 词项集合
+    """
+    tokens = set()
+    for chunk in CJK_RE.split(text):
+        tokens.update(word.lower()[:TERM_MAX_LENGTH] for word in WORD_RE.findall(chunk))
+    for run in CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def get_document_count():
+    """已索引的商品数，缓存未命中时查询一次"""
+    total = cache.get(DOCUMENT_COUNT_CACHE_KEY)
+    if total is None:
+        total = Goods.objects.count()
+        cache.set(DOCUMENT_COUNT_CACHE_KEY, total, timeout=DOCUMENT_COUNT_TIMEOUT)
+    return total
+
+
+def invalidate_document_count():
+    """事务提交后清除商品总数缓存，避免提交前被其他请求以旧值重新缓存"""
+    transaction.on_commit(lambda: cache.delete(DOCUMENT_COUNT_CACHE_KEY))
+
+
+def goods_terms(goods):
+    """计算一个商品的 {词项: 权重}"""
+    weights = defaultdict(float)
+    for field, field_weight in SEARCH_FIELDS:
+        text = getattr(goods, field) or ''
+        if field == 'goods_desc':
+            text = strip_tags(text)
+        for term, tf in Counter(tokenize(text)).items():
+            weights[term] += field_weight * tf * (TERM_SATURATION + 1) / (tf + TERM_SATURATION)
+    return weights
+
+
+def build_terms(goods):
+    return [GoodsSearchTerm(goods_id=goods.id, term=term, weight=weight)
+            for term, weight in goods_terms(goods).items()]
+
+
+def search_fields_changed(goods, update_fields=None):
+    """
+    保存商品时参与索引的字段是否有修改（保存前调用）：新商品为 True；
+    指定了 update_fields 时只比较其中参与索引的字段，否则按主键读取已保存的值比较
+    """
+    names = [field for field, _ in SEARCH_FIELDS]
+    if update_fields is not None:
+        names = [name for name in names if name in update_fields]
+        if not names:
+            return False
+    if goods._state.adding or goods.pk is None:
+        return True
+    stored = Goods.objects.filter(pk=goods.pk).values_list(*names).first()
+    return stored != tuple(getattr(goods, name) for name in names)
+
+
+def index_goods(goods):
+    """增量更新单个商品的索引"""
+    with transaction.atomic():
+        GoodsSearchTerm.objects.filter(goods_id=goods.id).delete()
+        GoodsSearchTerm.objects.bulk_create(build_terms(goods))
+
+
+def rebuild_index(batch_size=500):
+    """
+    全量重建索引
+    :return: 索引的商品数
+    """
+    fields = ['id'] + [field for field, _ in SEARCH_FIELDS]
+    count = 0
+    with transaction.atomic():
+        GoodsSearchTerm.objects.all().delete()
+        terms = []
+        for goods in Goods.objects.only(*fields).order_by('id').iterator(chunk_size=batch_size):
+            terms.extend(build_terms(goods))
+            count += 1
+            if len(terms) >= batch_size:
+                GoodsSearchTerm.objects.bulk_create(terms, batch_size=batch_size)
+                terms = []
+        GoodsSearchTerm.objects.bulk_create(terms, batch_size=batch_size)
+        touch(GoodsSearchTerm)
+        invalidate_document_count()
+    return count
+
+
+def search(keywords, limit=MAX_RESULTS):
+    """
+    按相关度搜索商品：只读取查询词项的倒排记录（term 上有索引），不扫描商品表，商品总数取自缓存
+    得分 = Σ 词项权重 × idf
+    :param keywords: 搜索词
+    :param limit: 最多返回个数
+    :return: 按相关度降序排列的商品 id 列表
+    """
+    query_terms = tokenize_query(keywords)
+    if not query_terms:
+        return []
+
+    postings = defaultdict(list)
+    for term, goods_id, weight in GoodsSearchTerm.objects.filter(term__in=query_terms).values_list(
+            'term', 'goods_id', 'weight'):
+        postings[term].append((goods_id, weight))
+    if not postings:
+        return []
+
+    total = get_document_count()
+    scores = defaultdict(float)
+    for term, items in postings.items():
+        idf = math.log(1 + (total - len(items) + 0.5) / (len(items) + 0.5))
+        for goods_id, weight in items:
+            scores[goods_id] += weight * idf
+
+    return sorted(scores, key=lambda goods_id: (-scores[goods_id], goods_id))[:limit]
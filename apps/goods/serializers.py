@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from drf_writable_nested import WritableNestedModelSerializer
 
-from goods.models import Goods, GoodsCategory, GoodsImage
+from goods.counters import get_goods_counter
+from goods.models import Goods, GoodsCategory, GoodsImage, Banner, HotSearchWords
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -35,3 +36,37 @@ class GoodsSerializer(WritableNestedModelSerializer, serializers.ModelSerializer
     class Meta:
         model = Goods
         fields = '__all__'
+
+    def to_representation(self, instance):
+        return self.finalize(super().to_representation(instance))
+
+    def finalize(self, data):
+        """点击数、收藏数加上尚未写入数据库的增量（ValuesSerializer 也会调用）"""
+        return get_goods_counter().merge(data)
+
+
+class GoodsListSerializer(GoodsSerializer):
+    """
+    商品列表、购物车、订单、收藏中的商品：不返回商品详情（goods_desc），详情只在 retrieve 中返回
+    配合 Goods.objects.summary() / with_goods_related() 使用，goods_desc 不会从数据库读取
+    """
+
+    class Meta:
+        model = Goods
+        exclude = ('goods_desc',)
+
+
+class BannerSerializer(serializers.ModelSerializer):
+    """首页轮播图"""
+
+    class Meta:
+        model = Banner
+        fields = '__all__'
+
+
+class HotWordsSerializer(serializers.ModelSerializer):
+    """热搜词"""
+
+    class Meta:
+        model = HotSearchWords
+        fields = ('id', 'keywords', 'index')
@@ -0,0 +1,55 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from goods.cache import invalidate_category_tree, invalidate_index_fragments, INDEX_FRAGMENTS
+from goods.models import GoodsCategory, Goods, GoodsImage
+from goods.search import index_goods, invalidate_document_count, search_fields_changed
+from utils.conditional import touch
+
+
+@receiver([post_save, post_delete], sender=GoodsCategory)
+def clear_category_tree(sender, instance=None, **kwargs):
+    """类目新增、修改、删除后，清除分类树缓存"""
+    invalidate_category_tree()
+
+
+@receiver(pre_save, sender=Goods)
+def check_search_fields(sender, instance=None, raw=False, update_fields=None, **kwargs):
+    """保存前记下参与索引的字段是否修改，只修改计数、价格等字段时不重建索引"""
+    if not raw:
+        instance._search_fields_changed = search_fields_changed(instance, update_fields)
+
+
+@receiver(post_save, sender=Goods)
+def update_search_index(sender, instance=None, created=False, raw=False, **kwargs):
+    """商品新增、修改名称、简介、详情后增量更新搜索索引（删除时索引随外键级联删除）"""
+    if not raw and getattr(instance, '_search_fields_changed', True):
+        index_goods(instance)
+    if created:
+        invalidate_document_count()
+
+
+@receiver(post_delete, sender=Goods)
+def clear_document_count(sender, instance=None, **kwargs):
+    """商品删除后清除搜索用的商品总数"""
+    invalidate_document_count()
+
+
+def clear_index_fragments(sender, instance=None, **kwargs):
+    """首页相关数据变更后，清除依赖该模型的首页片段缓存"""
+    invalidate_index_fragments(sender)
+
+
+for model in {model for _, _, models in INDEX_FRAGMENTS.values() for model in models}:
+    post_save.connect(clear_index_fragments, sender=model)
+    post_delete.connect(clear_index_fragments, sender=model)
+
+
+def touch_catalog_version(sender, instance=None, **kwargs):
+    """商品目录数据变更后更新表版本号，条件请求（ETag / Last-Modified）随之失效"""
+    touch(sender)
+
+
+for model in {Goods, GoodsCategory, GoodsImage} | {model for _, _, models in INDEX_FRAGMENTS.values() for model in models}:
+    post_save.connect(touch_catalog_version, sender=model)
+    post_delete.connect(touch_catalog_version, sender=model)
@@ -1,3 +1,283 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from goods.cache import get_category_tree, get_index_data
+from goods.counters import get_goods_counter
+from goods.management.commands.check_query_plans import hot_queries, explain
+from goods.models import Goods, GoodsCategory, GoodsImage, GoodsSearchTerm, Banner
+from goods.search import search
+from goods.serializers import GoodsSerializer
+from goods.views import GoodsListViewSet
+from utils.pagination import KeysetPagination
+from utils.testing import LOCMEM_CACHES, FILE_CACHES
+
+def create_goods(count, **kwargs):
+    """创建三级类目和 count 个商品，每个商品两张轮播图"""
+    category = GoodsCategory.objects.create(name='生鲜', category_type=1)
+    category = GoodsCategory.objects.create(name='水果', category_type=2, parent_category=category)
+    category = GoodsCategory.objects.create(name='苹果', category_type=3, parent_category=category)
+    goods = []
+    for i in range(count):
+        item = Goods.objects.create(name=f'苹果{i}', goods_brief='新鲜水果', goods_desc='<p>红富士</p>',
+                                    category=category, shop_price=i, **kwargs)
+        GoodsImage.objects.bulk_create([GoodsImage(goods=item, image=f'goods/{i}-{j}.png') for j in range(2)])
+        goods.append(item)
+    return goods
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GoodsQueryCountTest(TestCase):
+    """商品列表的查询数不随每页个数增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_goods(20)
+
+    def test_serializer_query_count(self):
+        # 商品 1 条 + 轮播图 1 条，分类随商品 JOIN 取出
+        for size in (1, 5, 20):
+            with self.assertNumQueries(2):
+                GoodsSerializer(Goods.objects.with_related().order_by('id')[:size], many=True).data
+
+    def test_list_query_count(self):
+        with mock.patch.object(KeysetPagination, 'page_size', 1):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/goods/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+        for size in (5, 20):
+            with mock.patch.object(KeysetPagination, 'page_size', size):
+                with self.assertNumQueries(len(ctx)):
+                    response = self.client.get('/goods/', HTTP_ACCEPT='application/json')
+            self.assertEqual(len(response.json()['results']), size)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GoodsPaginationTest(TestCase):
+    """商品列表分页"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_goods(25)
+        # 一半商品的添加时间相同，按 id 区分先后
+        Goods.objects.filter(id__in=Goods.objects.order_by('id').values('id')[:12]).update(
+            add_time=Goods.objects.order_by('id').first().add_time)
+        cls.ordered_ids = list(Goods.objects.order_by('-add_time', '-id').values_list('id', flat=True))
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor(self):
+        # 沿 next 链接翻完所有页，不重复、不遗漏
+        ids, url = [], '/goods/'
+        while url:
+            data = self.get(url)
+            self.assertEqual(data['count'], 25)
+            ids.extend(goods['id'] for goods in data['results'])
+            url = data['next']
+        self.assertEqual(ids, self.ordered_ids)
+
+        # 从最后一页沿 previous 链接翻回第一页
+        data = self.get(self.get('/goods/')['next'])
+        data = self.get(data['previous'])
+        self.assertEqual([goods['id'] for goods in data['results']], self.ordered_ids[:10])
+
+    def test_without_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.get('/goods/')
+        with self.assertNumQueries(len(ctx) - 1):
+            data = self.get('/goods/?count=0')
+        self.assertNotIn('count', data)
+
+    def test_page_number(self):
+        # 带 page 参数的旧客户端仍按页码分页
+        data = self.get('/goods/?page=2')
+        self.assertEqual(data['count'], 25)
+        self.assertEqual([goods['id'] for goods in data['results']], self.ordered_ids[10:20])
+        self.assertIn('page=3', data['next'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GoodsExportTest(TestCase):
+    """管理员导出商品，分批查询、流式输出"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_goods(5)
+        cls.admin = get_user_model().objects.create_superuser(username='admin', password='password')
+
+    def test_export(self):
+        self.client.force_login(self.admin)
+        with mock.patch.object(GoodsListViewSet, 'export_chunk_size', 2):
+            response = self.client.get('/goods/export/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="goods.json"')
+        # 每批（2 个商品）单独编码、写出
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 5)
+        exported = json.loads(b''.join(chunks))
+        # 与商品详情接口的输出一致
+        expected = [self.client.get(f'/goods/{item.id}/', HTTP_ACCEPT='application/json').json()
+                    for item in Goods.objects.order_by('id')]
+        self.assertEqual(exported, expected)
+
+    def test_permission(self):
+        response = self.client.get('/goods/export/', HTTP_ACCEPT='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GoodsSearchTest(TestCase):
+    """商品搜索"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.goods = create_goods(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_document_count_cached(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(search('苹果'), [goods.id for goods in self.goods])
+        # 商品总数已缓存，只查询倒排记录
+        with self.assertNumQueries(1):
+            search('苹果')
+
+        # 新增商品后重新统计
+        with self.captureOnCommitCallbacks(execute=True):
+            goods = create_goods(1)[0]
+        with self.assertNumQueries(2):
+            self.assertIn(goods.id, search('苹果'))
+
+    def test_bigram_query(self):
+        category = self.goods[0].category
+        mango = Goods.objects.create(name='芒果', goods_brief='', goods_desc='', category=category)
+        juice = Goods.objects.create(name='果汁', goods_brief='', goods_desc='', category=category)
+        # 只按“苹果”二元组查询，不匹配只含“果”字的商品
+        self.assertEqual(search('苹果'), [goods.id for goods in self.goods])
+        self.assertEqual(search('芒果'), [mango.id])
+        # 只有一个字时按单字查询
+        self.assertEqual(set(search('果')), {goods.id for goods in self.goods} | {mango.id, juice.id})
+
+    def test_reindex_on_change(self):
+        goods = self.goods[0]
+        terms = list(GoodsSearchTerm.objects.filter(goods=goods).values_list('id', flat=True))
+        # 只修改计数、价格不重建索引
+        goods.click_num += 1
+        goods.save()
+        goods.shop_price = 100
+        goods.save(update_fields=['shop_price'])
+        self.assertEqual(list(GoodsSearchTerm.objects.filter(goods=goods).values_list('id', flat=True)), terms)
+
+        goods.name = '香蕉'
+        goods.save()
+        self.assertEqual(search('香蕉'), [goods.id])
+        self.assertNotIn(goods.id, search('苹果'))
+
+
+# 点击数留在缓冲区中，不在测试过程中写入
+@override_settings(CACHES=FILE_CACHES, GOODS_COUNTER={'flush_interval': 3600})
+class ConditionalGetTest(TestCase):
+    """商品列表、详情的条件请求"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.goods = create_goods(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, **headers):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **headers)
+
+    def test_list(self):
+        response = self.get('/goods/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.get('/goods/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.get('/goods/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        # 其他页的 ETag 不同
+        self.assertEqual(self.get('/goods/?count=0', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # 商品变更后版本号更新
+        with self.captureOnCommitCallbacks(execute=True):
+            self.goods[0].save()
+        self.assertEqual(self.get('/goods/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail(self):
+        first, second = self.goods
+        response = self.get(f'/goods/{first.id}/')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.get(f'/goods/{first.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(f'/goods/{second.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # 不存在的商品带着其他商品的 ETag 仍返回 404，不计点击数
+        self.assertEqual(self.get('/goods/999999/', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        self.assertEqual(get_goods_counter().pending(999999, 'click_num'), 0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache(self):
+        # 各进程的版本号不一致，不返回校验值
+        response = self.get('/goods/')
+        self.assertNotIn('ETag', response)
+        self.assertEqual(self.get('/goods/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryTreeCacheTest(TestCase):
+    """分类树缓存的清除"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_on_commit(self):
+        category = GoodsCategory.objects.create(name='生鲜', category_type=1)
+        get_category_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = '水果'
+            category.save()
+            # 提交后才清除：提交前清除会被其他请求以旧数据重新缓存
+            self.assertEqual(get_category_tree()[0]['name'], '生鲜')
+        self.assertEqual(get_category_tree()[0]['name'], '水果')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IndexCacheTest(TestCase):
+    """首页片段缓存的清除"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_on_commit(self):
+        get_index_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            Banner.objects.create(goods=create_goods(1)[0], image='banner/1.png', index=1)
+            self.assertEqual(get_index_data()[1]['banners'], 'hit')
+        _, cache_status = get_index_data()
+        self.assertEqual(cache_status['banners'], 'miss')
+        self.assertEqual(cache_status['hot_words'], 'hit')
+
+
+class QueryPlanTest(TestCase):
+    """热点接口的查询使用索引（check_query_plans 的检查）"""
+
+    def test_no_full_scan(self):
+        for name, queryset in hot_queries():
+            with self.subTest(name):
+                plan, full_scan = explain(queryset)
+                self.assertFalse(full_scan, f'{name}: {plan}')
@@ -1,11 +1,16 @@
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, viewsets, status
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.filters import SearchFilter
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from goods.serializers import GoodsSerializer
-from .models import Goods
-from .filters import GoodsFilter
+from goods.cache import get_category_tree, get_index_data, INDEX_FRAGMENTS
+from goods.counters import get_goods_counter
+from goods.serializers import GoodsSerializer, GoodsListSerializer, CategorySerializer
+from .models import Goods, GoodsCategory, GoodsImage, GoodsSearchTerm
+from .filters import GoodsFilter, GoodsSearchFilter
+from utils.conditional import ConditionalGetMixin
+from utils.fast_serializers import ValuesListModelMixin, ExportModelMixin
+from utils.pagination import KeysetPagination
 
 
 # class GoodsPagination(PageNumberPagination):
@@ -18,29 +23,107 @@ from .filters import GoodsFilter
 #     max_page_size = 100  # 最多能显示多少页
 
 
-class GoodsListViewSet(mixins.ListModelMixin,
+class GoodsListViewSet(ConditionalGetMixin,
+                       ValuesListModelMixin,
+                       ExportModelMixin,
+                       mixins.ListModelMixin,
                        mixins.RetrieveModelMixin,
                        mixins.CreateModelMixin,
                        viewsets.GenericViewSet):
     """
-    商品列表
+    商品列表（list 使用 ValuesSerializer 快速序列化）
+    export：管理员导出商品（含详情），流式输出
+    list、retrieve 支持条件请求（ETag / Last-Modified）
     """
-    # 分页
-    # pagination_class = GoodsPagination
+    # 分页：游标分页，翻页开销与页码无关
+    pagination_class = KeysetPagination
     # # 这里必须要定义一个默认的排序,否则会报错
     # queryset = Goods.objects.all().order_by('id')
-    queryset = Goods.objects.all()
+    queryset = Goods.objects.with_related()
     serializer_class = GoodsSerializer
+    export_serializer_class = GoodsSerializer
 
     # 过滤
-    filter_backends = (DjangoFilterBackend, SearchFilter,)
+    filter_backends = (DjangoFilterBackend, GoodsSearchFilter,)
 
     # 设置 filter 的类为自定义的类
     filter_class = GoodsFilter
 
-    # 搜索，=name 为精确搜索，也可以使用正则
-    search_fields = ('=name', 'goods_brief')
+    # 搜索（search 参数）由 GoodsSearchFilter 查询倒排索引，按相关度排序，索引字段见 goods.search.SEARCH_FIELDS
 
-    # 排序
+    # 排序，由 KeysetPagination 的 ordering 参数使用
     ordering_fields = ('sold_num', 'add_time')
 
+    # 条件请求的校验值取自这些表的版本号
+    conditional_models = (Goods, GoodsCategory, GoodsImage, GoodsSearchTerm)
+
+    def get_queryset(self):
+        # 列表不读取商品详情 goods_desc
+        if self.action == 'list':
+            return Goods.objects.summary()
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        # 列表使用精简的序列化，详情返回全部字段
+        if self.action == 'list':
+            return GoodsListSerializer
+        return GoodsSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        """商品详情，点击数 + 1（缓冲累加，定期写入数据库），返回 304 时同样计数"""
+        response = super().retrieve(request, *args, **kwargs)
+        goods_id = str(kwargs[self.lookup_field])
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED) and goods_id.isdigit():
+            get_goods_counter().increment(int(goods_id), 'click_num')
+        return response
+
+    @property
+    def paginator(self):
+        """
+        搜索结果按相关度排序（无法作为游标），且最多 goods.search.MAX_RESULTS 条，使用页码分页
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(GoodsSearchFilter.search_param):
+                self._paginator = PageNumberPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class CategoryViewSet(ConditionalGetMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    商品分类
+    list：商品分类树（一级类目，sub_cat 嵌套二级、三级类目），支持条件请求
+    """
+    queryset = GoodsCategory.objects.all()
+    serializer_class = CategorySerializer
+
+    # 分类树整体返回，不分页
+    pagination_class = None
+
+    conditional_models = (GoodsCategory,)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.category_tree, request)
+
+    def category_tree(self, request):
+        # 分类树一次查询构建并缓存，类目变更时由 signals 清除缓存
+        return Response(get_category_tree())
+
+
+class IndexViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    """
+    首页数据
+    list：轮播图、首页广告、热搜词、新品、热销商品，各片段单独缓存，支持条件请求
+    """
+    conditional_models = tuple({model for _, _, models in INDEX_FRAGMENTS.values() for model in models})
+
+    def list(self, request):
+        return self.conditional_response(self.index_data, request)
+
+    def index_data(self, request):
+        data, cache_status = get_index_data()
+        response = Response(data)
+        # 各片段缓存命中情况，例如 banners=hit,new_goods=miss
+        response['X-Cache-Fragments'] = ','.join(f'{name}={status}' for name, status in cache_status.items())
+        return response
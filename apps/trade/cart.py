@@ -0,0 +1,217 @@
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction, IntegrityError, close_old_connections
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from trade.models import ShoppingCart
+from utils.cache import is_shared_cache
+from utils.singleton import per_process
+
+logger = logging.getLogger(__name__)
+
+
+class BaseCartStore:
+    """
+    购物车存储后端，购物车内容为 {商品 id: 数量}
+    """
+
+    def get_items(self, user_id):
+        """获取用户购物车，返回 {goods_id: nums}"""
+        raise NotImplementedError
+
+    def add(self, user_id, goods_id, nums):
+        """加入购物车，已存在则累加数量，返回累加后的数量"""
+        raise NotImplementedError
+
+    def update(self, user_id, goods_id, nums):
+        """修改购物车中商品数量"""
+        raise NotImplementedError
+
+    def remove(self, user_id, goods_ids):
+        """从购物车中删除商品"""
+        raise NotImplementedError
+
+
+class DatabaseCartStore(BaseCartStore):
+    """直接读写 ShoppingCart 表"""
+
+    def get_items(self, user_id):
+        return dict(ShoppingCart.objects.filter(user_id=user_id).order_by('id').values_list('goods_id', 'nums'))
+
+    def add(self, user_id, goods_id, nums):
+        shop_carts = ShoppingCart.objects.filter(user_id=user_id, goods_id=goods_id)
+        # 已在购物车中：一条 UPDATE 在数据库中原子累加，并发时不会丢失数量
+        if not shop_carts.update(nums=F('nums') + nums):
+            try:
+                # 不在购物车中则插入；savepoint 使唯一约束冲突时只回滚这一条 INSERT
+                with transaction.atomic():
+                    ShoppingCart.objects.create(user_id=user_id, goods_id=goods_id, nums=nums)
+                return nums
+            except IntegrityError:
+                # 并发请求已插入同一 (user, goods)，重试累加
+                shop_carts.update(nums=F('nums') + nums)
+        return shop_carts.values_list('nums', flat=True).first()
+
+    def update(self, user_id, goods_id, nums):
+        ShoppingCart.objects.filter(user_id=user_id, goods_id=goods_id).update(nums=nums)
+
+    def remove(self, user_id, goods_ids):
+        ShoppingCart.objects.filter(user_id=user_id, goods_id__in=goods_ids).delete()
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    购物车保存在 Django 缓存中（每个用户一个 {goods_id: nums} 的 hash），读写不访问数据库
+    变更的用户记入脏集合，由后台线程每隔 flush_interval 秒批量写回 ShoppingCart 表
+    购物车以缓存为准，CACHES 必须是 redis 等进程间共享的缓存：
+    进程内缓存中每个进程各有一份购物车，后写回的进程会覆盖其他进程的修改
+    """
+    CART_KEY = 'trade:cart:{user_id}'
+    LOCK_KEY = 'trade:cart:{user_id}:lock'
+    LOCK_TIMEOUT = 5
+
+    def __init__(self, flush_interval=2):
+        if not is_shared_cache():
+            raise ImproperlyConfigured('CacheCartStore 需要 redis 等进程间共享的缓存，'
+                                       '使用进程内缓存时请配置 DatabaseCartStore')
+        self.flush_interval = flush_interval
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._flusher = None
+
+    @contextmanager
+    def _lock(self, user_id):
+        """
+        基于 cache.add 的用户级互斥锁（locmem、redis、memcached 的 add 都是原子的），
+        保证同一用户购物车的读改写不会丢失更新
+        """
+        key = self.LOCK_KEY.format(user_id=user_id)
+        while not cache.add(key, 1, timeout=self.LOCK_TIMEOUT):
+            time.sleep(0.001)
+        try:
+            yield
+        finally:
+            cache.delete(key)
+
+    def _load(self, user_id):
+        """缓存未命中时从数据库加载"""
+        key = self.CART_KEY.format(user_id=user_id)
+        items = cache.get(key)
+        if items is None:
+            items = DatabaseCartStore().get_items(user_id)
+            cache.set(key, items, timeout=None)
+        return items
+
+    def _save(self, user_id, items):
+        cache.set(self.CART_KEY.format(user_id=user_id), items, timeout=None)
+        self._mark_dirty(user_id)
+
+    def get_items(self, user_id):
+        return self._load(user_id)
+
+    def add(self, user_id, goods_id, nums):
+        with self._lock(user_id):
+            items = self._load(user_id)
+            items[goods_id] = items.get(goods_id, 0) + nums
+            self._save(user_id, items)
+        return items[goods_id]
+
+    def update(self, user_id, goods_id, nums):
+        with self._lock(user_id):
+            items = self._load(user_id)
+            if goods_id in items:
+                items[goods_id] = nums
+                self._save(user_id, items)
+
+    def remove(self, user_id, goods_ids):
+        with self._lock(user_id):
+            items = self._load(user_id)
+            for goods_id in goods_ids:
+                items.pop(goods_id, None)
+            self._save(user_id, items)
+
+    def _mark_dirty(self, user_id):
+        with self._dirty_lock:
+            self._dirty.add(user_id)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='cart-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('购物车写回数据库失败')
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """
+        将脏用户的购物车批量同步到 ShoppingCart 表：
+        一次查询取出已有记录，再用 DELETE + bulk_update + bulk_create 三条语句写回
+        """
+        with self._dirty_lock:
+            user_ids, self._dirty = self._dirty, set()
+        if not user_ids:
+            return
+
+        try:
+            self._write_back(user_ids)
+        except IntegrityError:
+            # 其他进程同时写回了相同用户，下次重新同步
+            self._mark_dirty_many(user_ids)
+        except Exception:
+            # 写回失败（数据库、缓存不可用等），下次重试
+            self._mark_dirty_many(user_ids)
+            raise
+
+    def _mark_dirty_many(self, user_ids):
+        with self._dirty_lock:
+            self._dirty.update(user_ids)
+
+    def _write_back(self, user_ids):
+        keys = {self.CART_KEY.format(user_id=user_id): user_id for user_id in user_ids}
+        carts = {keys[key]: items for key, items in cache.get_many(keys).items()}
+
+        to_create, to_update, to_delete = [], [], []
+        existing = {(row.user_id, row.goods_id): row
+                    for row in ShoppingCart.objects.filter(user_id__in=carts.keys())}
+        for (user_id, goods_id), row in existing.items():
+            nums = carts[user_id].get(goods_id)
+            if nums is None:
+                to_delete.append(row.id)
+            elif nums != row.nums:
+                row.nums = nums
+                to_update.append(row)
+        for user_id, items in carts.items():
+            for goods_id, nums in items.items():
+                if (user_id, goods_id) not in existing:
+                    to_create.append(ShoppingCart(user_id=user_id, goods_id=goods_id, nums=nums))
+
+        with transaction.atomic():
+            if to_delete:
+                ShoppingCart.objects.filter(id__in=to_delete).delete()
+            if to_update:
+                ShoppingCart.objects.bulk_update(to_update, ['nums'])
+            if to_create:
+                ShoppingCart.objects.bulk_create(to_create)
+
+
+@per_process(settings=('CART_STORE',))
+def get_cart_store():
+    """获取当前进程的购物车存储后端，类由 CART_STORE 配置"""
+    store = import_string(settings.CART_STORE['BACKEND'])(**settings.CART_STORE.get('OPTIONS', {}))
+    if isinstance(store, CacheCartStore):
+        # 进程退出前写回未同步的购物车
+        atexit.register(store.flush)
+    return store
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from trade.orders import close_expired_orders
+
+
+class Command(BaseCommand):
+    help = '关闭超过支付期限（ORDER_PAY_TIMEOUT）仍未支付的订单，并归还库存；可在多个节点上同时执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每个事务处理的订单数')
+        parser.add_argument('--interval', type=int, default=0, help='大于 0 时常驻运行，每隔多少秒执行一次')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.time()
+            closed = close_expired_orders(batch_size=options['batch_size'])
+            self.stdout.write(f'关闭超时订单 {closed} 个，耗时 {time.time() - start:.2f}s')
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,70 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from trade.cart import get_cart_store
+from trade.models import ShoppingCart
+from trade.orders import expired_orders, close_orders
+from users.models import VerifyCode
+from users.verify import VERIFY_CODE_CACHE_TIMEOUT
+from utils.batch import iter_id_chunks
+
+
+class Command(BaseCommand):
+    help = '分批清理过期验证码、长期未下单的购物车记录，关闭超时未支付的订单'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不修改数据')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批处理的记录数，避免长时间锁表和主从延迟')
+        parser.add_argument('--sleep', type=float, default=0.1, help='每批之间暂停的秒数')
+        parser.add_argument('--verify-code-minutes', type=int, default=VERIFY_CODE_CACHE_TIMEOUT // 60, help='验证码保留的分钟数')
+        parser.add_argument('--cart-days', type=int, default=30, help='购物车记录保留的天数')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.sleep = options['sleep']
+        now = timezone.now()
+
+        self.process(
+            '过期验证码',
+            VerifyCode.objects.filter(add_time__lt=now - timedelta(minutes=options['verify_code_minutes'])),
+            lambda ids: VerifyCode.objects.filter(id__in=ids).delete()[0],
+        )
+        self.process(
+            '过期购物车',
+            ShoppingCart.objects.filter(add_time__lt=now - timedelta(days=options['cart_days'])),
+            self.delete_carts,
+        )
+        # 关闭时归还库存，跳过这期间已支付或被其他节点处理的订单
+        self.process('超时未支付订单', expired_orders(now), close_orders)
+
+    def delete_carts(self, ids):
+        rows = ShoppingCart.objects.filter(id__in=ids).values_list('user_id', 'goods_id')
+        user_goods = defaultdict(list)
+        for user_id, goods_id in rows:
+            user_goods[user_id].append(goods_id)
+        # 同步从购物车存储中删除，否则缓存中的购物车写回时会重新插入
+        cart_store = get_cart_store()
+        for user_id, goods_ids in user_goods.items():
+            cart_store.remove(user_id, goods_ids)
+        return ShoppingCart.objects.filter(id__in=ids).delete()[0]
+
+    def process(self, name, queryset, action):
+        """分批执行 action(ids)，输出进度"""
+        if self.dry_run:
+            self.stdout.write(f'{name}：待处理 {queryset.count()} 条（dry run）')
+            return
+
+        start = time.time()
+        total = 0
+        for batch, ids in enumerate(iter_id_chunks(queryset, self.chunk_size), start=1):
+            total += action(ids)
+            elapsed = time.time() - start
+            self.stdout.write(f'{name}：第 {batch} 批 {len(ids)} 条，累计 {total} 条，'
+                              f'{elapsed:.1f}s，{total / elapsed if elapsed else total:.0f} 条/秒')
+            time.sleep(self.sleep)
+        self.stdout.write(self.style.SUCCESS(f'{name}：共处理 {total} 条，耗时 {time.time() - start:.1f}s'))
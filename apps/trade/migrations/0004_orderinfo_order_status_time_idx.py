@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0003_orderinfo_order_user_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderinfo',
+            index=models.Index(fields=['pay_status', 'add_time'], name='order_status_time_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.4 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0004_orderinfo_order_status_time_idx'),
+    ]
+
+    operations = [
+        # 已有订单创建于下单扣减库存之前，没有占用库存
+        migrations.AddField(
+            model_name='orderinfo',
+            name='stock_reserved',
+            field=models.BooleanField(default=False, editable=False, verbose_name='已占用库存'),
+        ),
+        # 之后创建的订单都在下单时扣减库存
+        migrations.AlterField(
+            model_name='orderinfo',
+            name='stock_reserved',
+            field=models.BooleanField(default=True, editable=False, verbose_name='已占用库存'),
+        ),
+    ]
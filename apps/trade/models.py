@@ -33,6 +33,8 @@ class OrderInfo(models.Model):
         ("TRADE_FINISHED", "交易结束"),
         ("paying", "待支付"),
     )
+    # 未支付的状态，超过支付期限后关闭
+    UNPAID_STATUS = ("paying", "WAIT_BUYER_PAY")
 
     PAY_TYPE = (
         ("alipay", "支付宝"),
@@ -52,6 +54,8 @@ class OrderInfo(models.Model):
     post_script = models.CharField("订单留言", max_length=200)
     order_mount = models.FloatField("订单金额", default=0.0)
     pay_time = models.DateTimeField("支付时间", null=True, blank=True)
+    # 下单时是否扣减了库存：之前创建的订单没有扣减，关闭时不能归还；关闭归还后置为 False
+    stock_reserved = models.BooleanField("已占用库存", default=True, editable=False)
 
     # 用户信息
     address = models.CharField("收货地址", max_length=100, default="")
@@ -65,6 +69,12 @@ class OrderInfo(models.Model):
     class Meta:
         verbose_name = "订单信息"
         verbose_name_plural = verbose_name
+        indexes = [
+            # 个人订单列表，按下单时间倒序分页
+            models.Index(fields=['user', 'add_time', 'id'], name='order_user_time_idx'),
+            # 查找超时未支付的订单
+            models.Index(fields=['pay_status', 'add_time'], name='order_status_time_idx'),
+        ]
 
     def __str__(self):
         return str(self.order_sn)
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum, Case, When, Value
+from django.utils import timezone
+from goods.models import Goods
+from trade.models import OrderInfo, OrderGoods
+from utils.batch import iter_id_chunks
+from utils.conditional import touch
+
+
+def expired_orders(now=None):
+    """超过支付期限仍未支付的订单"""
+    now = now or timezone.now()
+    return OrderInfo.objects.filter(pay_status__in=OrderInfo.UNPAID_STATUS, add_time__lt=now - settings.ORDER_PAY_TIMEOUT)
+
+
+def restore_stock(order_ids):
+    """
+    归还订单占用的库存、扣回销量：按商品汇总数量后，一条 UPDATE ... CASE 完成
+    只归还下单时扣减过库存的订单
+    """
+    totals = dict(OrderGoods.objects.filter(order_id__in=order_ids, order__stock_reserved=True).values('goods_id')
+                  .annotate(total=Sum('goods_num')).values_list('goods_id', 'total'))
+    if not totals:
+        return
+    delta = Case(*[When(id=goods_id, then=Value(total)) for goods_id, total in totals.items()], default=Value(0))
+    Goods.objects.filter(id__in=totals.keys()).update(
+        goods_num=F('goods_num') + delta,
+        sold_num=F('sold_num') - delta,
+    )
+    touch(Goods)
+
+
+def close_orders(order_ids):
+    """
+    关闭给定订单中仍未支付的订单并归还库存，返回关闭的订单数
+    SELECT ... FOR UPDATE SKIP LOCKED：多个节点同时执行时，已被其他节点锁定的订单直接跳过；
+    加锁后再次确认状态，已关闭、已支付的订单不会重复处理，可重复执行
+    """
+    with transaction.atomic():
+        ids = list(OrderInfo.objects.select_for_update(skip_locked=True)
+                   .filter(id__in=order_ids, pay_status__in=OrderInfo.UNPAID_STATUS)
+                   .values_list('id', flat=True))
+        if not ids:
+            return 0
+        restore_stock(ids)
+        OrderInfo.objects.filter(id__in=ids).update(pay_status='TRADE_CLOSED', stock_reserved=False)
+    return len(ids)
+
+
+def close_expired_orders(batch_size=500, sleep=0):
+    """分批关闭超时未支付的订单，返回关闭的订单数"""
+    total = 0
+    for ids in iter_id_chunks(expired_orders(), batch_size):
+        total += close_orders(ids)
+        time.sleep(sleep)
+    return total
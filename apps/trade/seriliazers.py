@@ -1,8 +1,11 @@
+from django.utils import timezone
 from rest_framework import serializers
 
 from goods.models import Goods
-from goods.serializers import GoodsSerializer
+from goods.serializers import GoodsListSerializer
+from trade.cart import get_cart_store
 from trade.models import ShoppingCart, OrderGoods, OrderInfo
+from utils.order_sn import get_order_sn_generator
 
 
 class ShopCartSerializer(serializers.Serializer):
@@ -18,6 +21,7 @@ class ShopCartSerializer(serializers.Serializer):
                                     })
     # 外键，获取 goods 中所有值，必须指定 queryset，继承 ModelSerializer 无需指定
     goods = serializers.PrimaryKeyRelatedField(required=True, queryset=Goods.objects.all())
+    # 购物车存储只保存数量，这里返回本次加入、修改购物车的时间
     add_time = serializers.DateTimeField(read_only=True, format="%Y-%m-%d %H:%M")
 
     def create(self, validated_data):
@@ -28,34 +32,25 @@ class ShopCartSerializer(serializers.Serializer):
         """
         # 获取当前用户
         user = self.context['request'].user
-        nums = validated_data['nums']
         goods = validated_data['goods']
 
-        # 查询数据库，若有记录（表示添加到购物车，该商品），数量 + nums，否则就添加到购物车
-        existed = ShoppingCart.objects.filter(user=user, goods=goods)
+        # 加入购物车存储，若已有该商品则数量 + nums
+        nums = get_cart_store().add(user.id, goods.id, validated_data['nums'])
 
-        # 数量增加
-        if existed:
-            existed = existed[0]
-            existed.nums += nums
-            existed.save()
-        else:
-            # 添加到购物车
-            existed = ShoppingCart.objects.create(**validated_data)
-
-        return existed
+        return ShoppingCart(user=user, goods=goods, nums=nums, add_time=timezone.now())
 
     def update(self, instance, validated_data):
         """更新购物车，修改数量"""
         instance.nums = validated_data['nums']
-        instance.save()
+        get_cart_store().update(instance.user_id, instance.goods_id, instance.nums)
+        instance.add_time = timezone.now()
         return instance
 
 
 class ShopCartDetailSerializer(serializers.ModelSerializer):
     """购物车中商品详情"""
     # 一个购物车对应一个商品.
-    goods = GoodsSerializer(many=False, required=True)
+    goods = GoodsListSerializer(many=False, required=True)
 
     class Meta:
         model = ShoppingCart
@@ -64,7 +59,7 @@ class ShopCartDetailSerializer(serializers.ModelSerializer):
 
 class OrderGoodsSerializer(serializers.ModelSerializer):
     """订单中的商品"""
-    goods = GoodsSerializer(many=False)
+    goods = GoodsListSerializer(many=False)
 
     class Meta:
         model = OrderGoods
@@ -102,16 +97,10 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def generate_order_sn(self):
         """
-        生成订单号：当前时间+userid+随机数
+        生成订单号：Snowflake 风格（毫秒时间戳 + worker id + 序列号），进程内单调递增、全局唯一
         :return:
         """
-        import time
-        from random import Random
-        random_str = Random()
-        order_sn = "{time_str}{userid}{ranstr}".format(time_str=time.strftime("%Y%m%d%H%M%S"),
-                                                       userid=self.context['request'].user.id,
-                                                       ranstr=random_str.randint(10, 99))
-        return order_sn
+        return get_order_sn_generator()()
 
     def validate(self, attrs):
         """validate 中添加 order_sn，然后再 view 中就可以 save"""
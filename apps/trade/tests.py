@@ -1,3 +1,248 @@
-from django.test import TestCase
+import multiprocessing
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, connections, DatabaseError
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from goods.models import Goods, GoodsCategory
+from trade.cart import get_cart_store, CacheCartStore, DatabaseCartStore
+from trade.models import OrderInfo, OrderGoods, ShoppingCart
+from trade.orders import close_expired_orders
+from utils.order_sn import get_order_sn_generator
+from utils.testing import LOCMEM_CACHES, FILE_CACHES, DATABASE_CACHES, SharedDatabaseMixin
+
+User = get_user_model()
+
+ORDER_DATA = {
+    'post_script': '尽快发货',
+    'address': '北京市海淀区',
+    'signer_name': '张三',
+    'singer_mobile': '13800000000',
+    'order_mount': 10,
+}
+
+
+def create_goods(**kwargs):
+    category = GoodsCategory.objects.create(name='水果', category_type=1)
+    return Goods.objects.create(name='苹果', goods_brief='新鲜水果', goods_desc='', category=category, **kwargs)
+
+
+def run_threads(target, args_list):
+    """每组参数一个线程，所有线程就绪后同时开始；线程结束时关闭各自的数据库连接"""
+    barrier = threading.Barrier(len(args_list))
+    results = []
+
+    def run(*args):
+        try:
+            barrier.wait()
+            results.append(target(*args))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class DatabaseCartStoreTest(SharedDatabaseMixin, TransactionTestCase):
+    """并发加入购物车"""
+    THREADS = 8
+    ADDS = 5
+
+    def test_concurrent_add(self):
+        user = User.objects.create_user(username='buyer', password='password')
+        goods = create_goods(goods_num=100)
+        store = DatabaseCartStore()
+
+        def add():
+            for _ in range(self.ADDS):
+                store.add(user.id, goods.id, 1)
+
+        # 第一次加购时多个线程同时 INSERT，唯一约束冲突的线程改为累加；之后每次累加都是一条原子 UPDATE
+        run_threads(add, [()] * self.THREADS)
+        self.assertEqual(list(ShoppingCart.objects.values_list('nums', flat=True)), [self.THREADS * self.ADDS])
+
+
+class CacheCartStoreTest(TestCase):
+    """缓存购物车的写回"""
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache(self):
+        # 进程内缓存中各进程的购物车互相覆盖，拒绝启动
+        with self.assertRaises(ImproperlyConfigured):
+            CacheCartStore()
+
+    @override_settings(CACHES=FILE_CACHES)
+    def test_flush_retry(self):
+        user = User.objects.create_user(username='buyer', password='password')
+        goods = create_goods(goods_num=10)
+        cache.clear()
+        store = CacheCartStore(flush_interval=3600)
+        store.add(user.id, goods.id, 2)
+
+        # 写回失败时用户留在脏集合中，下次重试
+        with mock.patch.object(ShoppingCart.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                store.flush()
+        self.assertEqual(store._dirty, {user.id})
+        self.assertFalse(ShoppingCart.objects.exists())
+
+        store.flush()
+        self.assertEqual(store._dirty, set())
+        self.assertEqual(list(ShoppingCart.objects.values_list('user_id', 'goods_id', 'nums')),
+                         [(user.id, goods.id, 2)])
+
+
+def generate_order_sns(count, queue):
+    """子进程中生成订单号"""
+    try:
+        generator = get_order_sn_generator()
+        queue.put((generator.worker_id, [generator() for _ in range(count)]))
+    finally:
+        connections.close_all()
+
+
+@override_settings(CACHES=DATABASE_CACHES, ORDER_SN_WORKER_ID=None)
+class OrderSnTest(SharedDatabaseMixin, TransactionTestCase):
+    """多个进程同时生成订单号"""
+    PROCESSES = 4
+    COUNT = 5000
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+
+    def test_unique_across_processes(self):
+        # 子进程各自建立数据库连接，不共用父进程的连接
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [context.Process(target=generate_order_sns, args=(self.COUNT, queue))
+                     for _ in range(self.PROCESSES)]
+        for process in processes:
+            process.start()
+        results = [queue.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+
+        # 各进程租用到不同的 worker id，订单号没有重复
+        self.assertEqual(len({worker_id for worker_id, _ in results}), self.PROCESSES)
+        order_sns = [order_sn for _, order_sns in results for order_sn in order_sns]
+        self.assertEqual(len(set(order_sns)), self.PROCESSES * self.COUNT)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ORDER_SN_WORKER_ID=1)
+class OrderStockTest(SharedDatabaseMixin, TransactionTestCase):
+    """并发下单时库存的条件扣减"""
+    THREADS = 8
+
+    def test_last_unit(self):
+        goods = create_goods(goods_num=1)
+        clients = []
+        for i in range(self.THREADS):
+            user = User.objects.create_user(username=f'buyer{i}', password='password')
+            get_cart_store().add(user.id, goods.id, 1)
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        statuses = run_threads(lambda client: client.post('/orders/', ORDER_DATA).status_code,
+                               [(client,) for client in clients])
+
+        # 只有一个请求买到最后一件，其余因库存不足整体回滚
+        self.assertEqual(sorted(statuses), [201] + [400] * (self.THREADS - 1))
+        goods.refresh_from_db()
+        self.assertEqual((goods.goods_num, goods.sold_num), (0, 1))
+        self.assertEqual(OrderInfo.objects.count(), 1)
+        self.assertEqual(OrderGoods.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CloseOrderTest(TestCase):
+    """关闭超时未支付的订单"""
+
+    def test_restore_reserved_stock(self):
+        user = User.objects.create_user(username='buyer', password='password')
+        goods = create_goods(goods_num=5, sold_num=5)
+        order = OrderInfo.objects.create(user=user, order_sn='1', **ORDER_DATA)
+        OrderGoods.objects.create(order=order, goods=goods, goods_num=2)
+        # 下单扣减库存之前创建的订单没有占用库存
+        legacy = OrderInfo.objects.create(user=user, order_sn='2', stock_reserved=False, **ORDER_DATA)
+        OrderGoods.objects.create(order=legacy, goods=goods, goods_num=3)
+        OrderInfo.objects.update(add_time=timezone.now() - settings.ORDER_PAY_TIMEOUT - timedelta(minutes=1))
+
+        self.assertEqual(close_expired_orders(), 2)
+        goods.refresh_from_db()
+        self.assertEqual((goods.goods_num, goods.sold_num), (7, 3))
+        self.assertEqual(set(OrderInfo.objects.values_list('pay_status', 'stock_reserved')), {('TRADE_CLOSED', False)})
+
+        # 重复执行不会再次归还
+        self.assertEqual(close_expired_orders(), 0)
+        goods.refresh_from_db()
+        self.assertEqual(goods.goods_num, 7)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ORDER_SN_WORKER_ID=1)
+class DeleteOrderTest(TestCase):
+    """删除订单"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.goods = create_goods(goods_num=10)
+        self.client.force_login(self.user)
+
+    def create_order(self):
+        get_cart_store().add(self.user.id, self.goods.id, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/orders/', ORDER_DATA)
+        self.assertEqual(response.status_code, 201)
+        self.goods.refresh_from_db()
+        self.assertEqual((self.goods.goods_num, self.goods.sold_num), (9, 1))
+        return response.json()['id']
+
+    def test_unpaid(self):
+        # 取消未支付的订单，归还库存
+        order_id = self.create_order()
+        self.assertEqual(self.client.delete(f'/orders/{order_id}/').status_code, 204)
+        self.goods.refresh_from_db()
+        self.assertEqual((self.goods.goods_num, self.goods.sold_num), (10, 0))
+
+    def test_paid(self):
+        order_id = self.create_order()
+        OrderInfo.objects.filter(id=order_id).update(pay_status='TRADE_SUCCESS')
+        self.assertEqual(self.client.delete(f'/orders/{order_id}/').status_code, 204)
+        self.goods.refresh_from_db()
+        self.assertEqual((self.goods.goods_num, self.goods.sold_num), (9, 1))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ShoppingCartViewTest(TestCase):
+    """购物车接口"""
+
+    def test_add_and_update(self):
+        user = User.objects.create_user(username='buyer', password='password')
+        goods = create_goods(goods_num=10)
+        self.client.force_login(user)
+
+        response = self.client.post('/shopcarts/', {'goods': goods.id, 'nums': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['nums'], 2)
+        self.assertIsNotNone(response.json()['add_time'])
+
+        response = self.client.post('/shopcarts/', {'goods': goods.id, 'nums': 1})
+        self.assertEqual(response.json()['nums'], 3)
+
+        response = self.client.patch(f'/shopcarts/{goods.id}/', {'nums': 5}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['add_time'])
+        self.assertEqual(get_cart_store().get_items(user.id), {goods.id: 5})
@@ -1,23 +1,37 @@
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Prefetch, F
+from django.http import Http404
 from rest_framework import viewsets, mixins
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from goods.models import Goods, with_goods_related
+from goods.serializers import GoodsListSerializer
+from trade.cart import get_cart_store
 from trade.models import ShoppingCart, OrderGoods, OrderInfo
+from trade.orders import restore_stock
 from trade.seriliazers import ShopCartSerializer, ShopCartDetailSerializer, OrderSerializer, OrderDetailSerializer
+from users.authentication import CachedJWTAuthentication
+from utils.conditional import touch
+from utils.fast_serializers import ValuesListModelMixin, ValuesSerializer, ExportModelMixin
+from utils.pagination import KeysetPagination
 from utils.permissions import IsOwnerOrReadOnly
 
 
 class ShoppingCartViewSet(viewsets.ModelViewSet):
     """
-    购物车功能：
+    购物车功能（数据读写 CART_STORE 配置的存储后端）：
     list：获取购物车详情
     create：加入购物车
     delete：删除购物车记录
     """
     serializer_class = ShopCartSerializer
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
 
     # 商品 ID，用于购物车更新（update() 商品数量）
     lookup_field = "goods_id"
@@ -26,6 +40,47 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
         """获取当前用户购物车列表"""
         return ShoppingCart.objects.filter(user=self.request.user)
 
+    def get_cart_items(self):
+        """当前用户购物车 {goods_id: nums}"""
+        return get_cart_store().get_items(self.request.user.id)
+
+    def list(self, request, *args, **kwargs):
+        items = list(self.get_cart_items().items())
+        page = self.paginate_queryset(items)
+        shop_carts = self.serialize_cart_items(page if page is not None else items)
+        if page is not None:
+            return self.get_paginated_response(shop_carts)
+        return Response(shop_carts)
+
+    def serialize_cart_items(self, items):
+        """
+        输出与 ShopCartDetailSerializer（goods、nums）一致，
+        商品用 ValuesSerializer 从 values() 直接生成，一次查询商品、一次查询轮播图
+        """
+        fast = ValuesSerializer(GoodsListSerializer, context=self.get_serializer_context())
+        goods_map = {goods['id']: goods for goods in
+                     fast.to_representation(fast.values(Goods.objects.filter(id__in=[goods_id for goods_id, _ in items])))}
+        return [OrderedDict([('goods', goods_map[goods_id]), ('nums', nums)])
+                for goods_id, nums in items if goods_id in goods_map]
+
+    def get_object(self):
+        """根据商品 id 从购物车存储中取出记录"""
+        try:
+            goods_id = int(self.kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+
+        items = self.get_cart_items()
+        if goods_id not in items:
+            raise Http404
+
+        obj = ShoppingCart(user=self.request.user, goods_id=goods_id, nums=items[goods_id])
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def perform_destroy(self, instance):
+        get_cart_store().remove(instance.user_id, [instance.goods_id])
+
     def get_serializer_class(self):
         """动态选择 serializer"""
         if self.action == 'list':
@@ -34,17 +89,21 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
             return ShopCartSerializer
 
 
-class OrderViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin, mixins.DestroyModelMixin,
-                   mixins.RetrieveModelMixin):
+class OrderViewSet(ValuesListModelMixin, ExportModelMixin, viewsets.GenericViewSet, mixins.CreateModelMixin,
+                   mixins.ListModelMixin, mixins.DestroyModelMixin, mixins.RetrieveModelMixin):
     """
     订单相关
-    list：获取个人订单
+    list：获取个人订单（ValuesSerializer 快速序列化）
     create：创建订单
     delete：删除订单
+    export：管理员导出全部订单，流式输出
     """
     serializer_class = OrderSerializer
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
+
+    # 按下单时间倒序的游标分页
+    pagination_class = KeysetPagination
 
     def get_serializer_class(self):
         # 订单详情
@@ -53,29 +112,64 @@ class OrderViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.List
         else:
             return OrderSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """
-        提交订单之前步骤
-            1、将购物车中商品保存到 OrderGoods
-            2、清空购物车
+        提交订单之前步骤（同一事务内完成，任一商品库存不足则整体回滚）
+            1、扣减库存、增加销量，库存不足时不更新
+            2、将购物车中商品批量保存到 OrderGoods
+            3、清空购物车
         :param serializer:
         :return:
         """
         order = serializer.save()
-        # 获取购物车中所有商品
-        shop_carts = ShoppingCart.objects.filter(user=self.request.user)
-        for shop in shop_carts:
-            order_goods = OrderGoods()
-            order_goods.goods = shop.goods
-            order_goods.goods_num = shop.nums
-            order_goods.order = order
-            order_goods.save()
-
-            # 清空购物车
-            shop.delete()
+        user = self.request.user
+        cart_store = get_cart_store()
+        # 获取购物车中所有商品，按商品 id 排序，保证并发下单时加锁顺序一致，避免死锁
+        shop_carts = sorted(cart_store.get_items(user.id).items())
+
+        order_goods = []
+        for goods_id, nums in shop_carts:
+            # 条件更新：只有库存足够时才扣减，由数据库保证原子性，防止超卖
+            updated = Goods.objects.filter(id=goods_id, goods_num__gte=nums).update(
+                goods_num=F('goods_num') - nums,
+                sold_num=F('sold_num') + nums,
+            )
+            if not updated:
+                goods = Goods.objects.filter(id=goods_id).only('name').first()
+                raise ValidationError({'goods': f'{goods.name if goods else goods_id} 库存不足'})
+
+            order_goods.append(OrderGoods(order=order, goods_id=goods_id, goods_num=nums))
+
+        OrderGoods.objects.bulk_create(order_goods)
+        # 库存、销量已变更，商品列表的条件请求校验值随之失效
+        touch(Goods)
+
+        # 事务提交后清空购物车中已下单的商品
+        ordered_goods_ids = [goods_id for goods_id, _ in shop_carts]
+        transaction.on_commit(lambda: cart_store.remove(user.id, ordered_goods_ids))
 
         return order
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        删除订单：未支付的订单与超时关闭一样归还占用的库存（restore_stock 只归还下单时扣减过库存的订单）
+        锁定订单后再判断状态，与同时执行的超时关闭、支付回调不会重复归还
+        """
+        order = OrderInfo.objects.select_for_update().get(id=instance.id)
+        if order.pay_status in OrderInfo.UNPAID_STATUS:
+            restore_stock([order.id])
+        order.delete()
+
     def get_queryset(self):
-        return OrderInfo.objects.filter(user=self.request.user)
+        if self.action == 'export':
+            return OrderInfo.objects.all()
+        queryset = OrderInfo.objects.filter(user=self.request.user)
+        if self.action == 'retrieve':
+            # 订单详情嵌套 OrderGoods -> Goods，一次性预取
+            return queryset.prefetch_related(
+                Prefetch('goods', queryset=with_goods_related(OrderGoods.objects.all()))
+            )
+        return queryset
 
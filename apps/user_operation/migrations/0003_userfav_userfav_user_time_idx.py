@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_operation', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfav',
+            index=models.Index(fields=['user', 'add_time', 'id'], name='userfav_user_time_idx'),
+        ),
+    ]
@@ -18,6 +18,10 @@ class UserFav(models.Model):
         verbose_name = '用户收藏'
         verbose_name_plural = verbose_name
         unique_together = ("user", "goods")
+        indexes = [
+            # 个人收藏列表，按收藏时间倒序分页
+            models.Index(fields=['user', 'add_time', 'id'], name='userfav_user_time_idx'),
+        ]
 
     def __str__(self):
         return self.user.name
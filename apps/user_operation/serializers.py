@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from goods.serializers import GoodsSerializer
+from goods.serializers import GoodsListSerializer
 from user_operation.models import UserFav, UserLeavingMessage, UserAddress
 
 
@@ -31,7 +31,7 @@ class UserFavDetailSerializer(serializers.ModelSerializer):
     收藏详情
     """
     # 通过商品 id 获取收藏的商品，需要嵌套商品的序列化
-    goods = GoodsSerializer()
+    goods = GoodsListSerializer()
 
     class Meta:
         model = UserFav
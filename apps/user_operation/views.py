@@ -1,18 +1,23 @@
 from rest_framework import viewsets, mixins
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from goods.counters import get_goods_counter
+from goods.models import with_goods_related
 from user_operation.models import UserFav, UserLeavingMessage, UserAddress
 from user_operation.serializers import UserFavSerializer, UserFavDetailSerializer, UserLeavingMessageSerializer, \
     UserAddressSerializer
+from users.authentication import CachedJWTAuthentication
+from utils.fast_serializers import ValuesListModelMixin
+from utils.pagination import KeysetPagination
 from utils.permissions import IsOwnerOrReadOnly
 
 
-class UserFavViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin, mixins.DestroyModelMixin):
+class UserFavViewSet(ValuesListModelMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin,
+                     mixins.DestroyModelMixin):
     """
     用户商品收藏
-    ListModelMixin：收藏列表
+    ListModelMixin：收藏列表（ValuesSerializer 快速序列化）
     CreateModelMixin：收藏
     DestroyModelMixin：取消（删除）收藏，相应地要删除数据库中数据
     """
@@ -23,11 +28,14 @@ class UserFavViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Crea
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
 
     # 用户认证
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
 
     # 搜索的字段
     lookup_field = 'goods_id'
 
+    # 按收藏时间倒序的游标分页
+    pagination_class = KeysetPagination
+
     def get_serializer_class(self):
         """
         动态设置 serializer，get 时获取用户收藏详情
@@ -41,9 +49,23 @@ class UserFavViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.Crea
 
         return UserFavSerializer
 
+    def perform_create(self, serializer):
+        """收藏，商品收藏数 + 1"""
+        instance = serializer.save()
+        get_goods_counter().increment(instance.goods_id, 'fav_num')
+
+    def perform_destroy(self, instance):
+        """取消收藏，商品收藏数 - 1"""
+        instance.delete()
+        get_goods_counter().increment(instance.goods_id, 'fav_num', -1)
+
     def get_queryset(self):
         # 只能查看当前登录用户的收藏，禁止获取其他用户的收藏
-        return UserFav.objects.filter(user=self.request.user)
+        queryset = UserFav.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # 收藏列表嵌套商品详情，预取商品的分类和轮播图
+            return with_goods_related(queryset)
+        return queryset
 
 
 class UserLeavingMessageViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixins.ListModelMixin,
@@ -53,7 +75,7 @@ class UserLeavingMessageViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin
     """
     serializer_class = UserLeavingMessageSerializer
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
 
     def get_queryset(self):
         """用户只能看自己的留言"""
@@ -67,7 +89,7 @@ class UserAddressViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin, mixin
     、所有地址（ListModelMixin）、更新地址（UpdateModelMixin）
     """
     serializer_class = UserAddressSerializer
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
     permission_classes = (IsAuthenticated, IsOwnerOrReadOnly)
 
     def get_queryset(self):
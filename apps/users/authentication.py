@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from utils.cache import is_shared_cache
+
+USER_CACHE_KEY = 'users:jwt:{}'
+
+
+def invalidate_user(user_id):
+    """
+    清除缓存的用户，用户保存、删除时由 users.signals 调用，批量 update 用户后需手动调用。
+    事务提交后再清除一次：提交前其他请求可能又把旧的用户写入了缓存
+    """
+    key = USER_CACHE_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication 每个请求都按 token 中的用户 id 查询一次 UserProfile，
+    这里把通过校验的用户缓存 JWT_USER_CACHE_TIMEOUT 秒，命中时不查询数据库。
+    修改密码、停用等保存用户的操作会清除缓存，下一个请求重新查询并校验。
+    清除只对共享缓存中的用户对所有进程生效，缓存不在进程间共享（LocMemCache 等）时不缓存，每次查询
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not is_shared_cache():
+            return super().get_user(validated_token)
+
+        key = USER_CACHE_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+        elif api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            # 与 JWTAuthentication 一致：修改密码前签发的 token 失效
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
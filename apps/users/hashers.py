@@ -0,0 +1,54 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from utils.singleton import per_process
+
+
+class HashCost:
+    """哈希参数，每次使用时从 PASSWORD_HASH_COST[policy][参数名] 读取"""
+
+    def __init__(self, policy):
+        self.policy = policy
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        return settings.PASSWORD_HASH_COST[self.policy][self.name]
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """scrypt，参数取自 PASSWORD_HASH_COST['scrypt']"""
+    work_factor = HashCost('scrypt')
+    block_size = HashCost('scrypt')
+    parallelism = HashCost('scrypt')
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """argon2id，参数取自 PASSWORD_HASH_COST['argon2']，需安装 argon2-cffi"""
+    time_cost = HashCost('argon2')
+    memory_cost = HashCost('argon2')
+    parallelism = HashCost('argon2')
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256，迭代次数取自 PASSWORD_HASH_COST['pbkdf2']"""
+    iterations = HashCost('pbkdf2')
+
+
+@per_process(settings=('PASSWORD_HASH_WORKERS',), on_reset=lambda executor: executor.shutdown(wait=False))
+def get_hash_executor():
+    """
+    获取当前进程的密码哈希线程池（线程数由 PASSWORD_HASH_WORKERS 限制）。
+    hashlib 的 scrypt、pbkdf2_hmac 和 argon2-cffi 计算时释放 GIL，线程池即可使用多核，不需要进程池
+    """
+    return ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+
+async def run_in_hash_pool(func, *args):
+    """在密码哈希线程池中执行 func(*args)，不阻塞事件循环"""
+    return await asyncio.get_running_loop().run_in_executor(get_hash_executor(), functools.partial(func, *args))
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from users.views import login
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_async_login_user'
+BENCH_PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = ('登录并发测试：同步视图（WSGI，一个工作线程同一时间处理一个请求）与异步视图（ASGI，密码哈希在线程池中计算）'
+            '的吞吐量、同时处理的请求数和事件循环延迟。测试用户结束后删除')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=40, help='登录请求数')
+        parser.add_argument('--concurrency', type=int, default=20, help='异步视图同时发出的请求数')
+
+    def handle(self, *args, **options):
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        User.objects.create_user(username=BENCH_USERNAME, password=BENCH_PASSWORD)
+        body = json.dumps({'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+        try:
+            self.bench_sync(body, options['requests'])
+            asyncio.run(self.bench_async(body, options['requests'], options['concurrency']))
+        finally:
+            User.objects.filter(username=BENCH_USERNAME).delete()
+
+    def bench_sync(self, body, requests):
+        view = TokenObtainPairView.as_view()
+        factory = RequestFactory()
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = view(factory.post('/login/', body, content_type='application/json'))
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - start
+        # 同步视图执行期间工作线程被占用，不能处理其他请求
+        self.stdout.write(f'WSGI 同步视图：{requests / elapsed:.1f} 次/s，同时处理 1 个请求，'
+                          f'每次登录阻塞工作线程 {elapsed / requests * 1000:.1f} ms')
+
+    async def bench_async(self, body, requests, concurrency):
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(concurrency)
+        in_flight = max_in_flight = 0
+        max_lag = 0
+        done = False
+
+        async def one():
+            nonlocal in_flight, max_in_flight
+            async with semaphore:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                response = await login(factory.post('/login/', body, content_type='application/json'))
+                in_flight -= 1
+                assert response.status_code == 200, response.status_code
+
+        async def ticker():
+            # 每 10ms 醒来一次，实际间隔超出的部分即事件循环被阻塞的时间
+            nonlocal max_lag
+            while not done:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done = True
+        await ticker_task
+        self.stdout.write(f'ASGI 异步视图：{requests / elapsed:.1f} 次/s，同时处理 {max_in_flight} 个请求，'
+                          f'事件循环最大延迟 {max_lag * 1000:.1f} ms')
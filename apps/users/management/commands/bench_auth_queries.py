@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from trade.views import ShoppingCartViewSet, OrderViewSet
+from user_operation.views import UserFavViewSet
+from users.authentication import USER_CACHE_KEY
+from utils.cache import is_shared_cache
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_auth_user'
+BENCH_PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = ('需要登录的列表接口每个请求的 SQL 数：JWTAuthentication 与 CachedJWTAuthentication（缓存用户）对比，'
+            '其中查询用户表的为认证产生的查询；测试用户在事务中创建，结束后回滚')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='每种情况的请求次数')
+
+    def handle(self, *args, **options):
+        if not is_shared_cache():
+            self.stderr.write('默认缓存不在进程间共享，CachedJWTAuthentication 不缓存用户')
+        # 默认的 testserver 不在 ALLOWED_HOSTS 中，DEBUG 下 localhost 总是允许
+        factory = RequestFactory(SERVER_NAME='localhost')
+        user_table = User._meta.db_table
+
+        with transaction.atomic():
+            user = User.objects.create_user(username=BENCH_USERNAME, password=BENCH_PASSWORD)
+            token = str(AccessToken.for_user(user))
+            cache.delete(USER_CACHE_KEY.format(user.id))
+
+            cases = (
+                ('购物车', '/shopcarts/', ShoppingCartViewSet),
+                ('订单列表', '/orders/', OrderViewSet),
+                ('收藏列表', '/userfavs/', UserFavViewSet),
+            )
+            for name, url, viewset in cases:
+                uncached = type(f'Uncached{viewset.__name__}', (viewset,),
+                                {'authentication_classes': (JWTAuthentication, SessionAuthentication)})
+                for label, view in (('JWTAuthentication', uncached.as_view({'get': 'list'})),
+                                    ('CachedJWTAuthentication', viewset.as_view({'get': 'list'}))):
+                    queries = auth_queries = 0
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        request = factory.get(url, HTTP_ACCEPT='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+                        with CaptureQueriesContext(connection) as ctx:
+                            response = view(request)
+                        queries += len(ctx)
+                        auth_queries += sum(user_table in query['sql'] for query in ctx.captured_queries)
+                        if response.status_code != 200:
+                            self.stderr.write(f'{name}：状态码 {response.status_code}')
+                            break
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'{name} {label:<24} {elapsed / options["requests"] * 1000:8.2f} ms/次 '
+                                      f'{queries / options["requests"]:.1f} 条 SQL/次 '
+                                      f'其中认证 {auth_queries / options["requests"]:.1f} 条')
+            cache.delete(USER_CACHE_KEY.format(user.id))
+            transaction.set_rollback(True)
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+# 各数据库对应的支持健康检查、连接池的后端
+ENGINES = {
+    'mysql': 'utils.db.mysql',
+    'sqlite': 'utils.db.sqlite3',
+}
+
+MODES = (
+    ('每个请求新建连接', {'CONN_MAX_AGE': 0}),
+    ('持久连接 + 健康检查', {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True}),
+    ('连接池', {'CONN_MAX_AGE': 0, 'POOL': {'SIZE': 4, 'MAX_OVERFLOW': 0, 'TIMEOUT': 30}}),
+)
+
+
+class Command(BaseCommand):
+    help = '模拟请求（请求开始、执行一条查询、请求结束）的耗时：每个请求新建连接、持久连接、连接池'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='使用该数据库的连接配置')
+        parser.add_argument('--requests', type=int, default=500, help='每个线程的请求数')
+        parser.add_argument('--threads', type=int, default=8, help='并发线程数（连接池模式下多于连接数）')
+
+    def handle(self, *args, **options):
+        base = connections[options['database']]
+        engine = ENGINES[base.vendor]
+        for name, overrides in MODES:
+            settings_dict = {**base.settings_dict, 'ENGINE': engine, **overrides}
+            alias = f'bench-{name}'
+            latencies = []
+            lock = threading.Lock()
+
+            def worker():
+                # 与 Django 相同，每个线程一个 DatabaseWrapper
+                connection = load_backend(engine).DatabaseWrapper(settings_dict, alias)
+                local = []
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    # 请求开始、结束时 Django 调用 close_old_connections
+                    connection.close_if_unusable_or_obsolete()
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                    connection.close_if_unusable_or_obsolete()
+                    local.append(time.perf_counter() - start)
+                connection.close()
+                with lock:
+                    latencies.extend(local)
+
+            threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            latencies.sort()
+            self.stdout.write(f'{name}：平均 {sum(latencies) / len(latencies) * 1000:.3f} ms，'
+                              f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms，'
+                              f'{len(latencies) / elapsed:.0f} 次/s')
+            pool = load_backend(engine).DatabaseWrapper(settings_dict, alias).get_pool()
+            if pool is not None:
+                self.stdout.write(f'    连接池指标：{pool.stats()}')
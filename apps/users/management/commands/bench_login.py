@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_login_user'
+BENCH_MOBILE = '13900000000'
+BENCH_PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = '登录接口（login/，TokenObtainPairView）吞吐量测试，测试用户在事务中创建，结束后回滚'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='每种登录方式的请求次数')
+
+    def handle(self, *args, **options):
+        view = TokenObtainPairView.as_view()
+        factory = RequestFactory()
+
+        with transaction.atomic():
+            User.objects.create_user(username=BENCH_USERNAME, mobile=BENCH_MOBILE, password=BENCH_PASSWORD)
+            cases = (
+                ('用户名', BENCH_USERNAME, BENCH_PASSWORD, 200),
+                ('手机号', BENCH_MOBILE, BENCH_PASSWORD, 200),
+                ('密码错误', BENCH_MOBILE, 'wrong-password', 401),
+                ('用户不存在', '13900000001', BENCH_PASSWORD, 401),
+            )
+            for name, username, password, expected in cases:
+                body = json.dumps({'username': username, 'password': password})
+                queries = 0
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    request = factory.post('/login/', body, content_type='application/json')
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = view(request)
+                    queries += len(ctx)
+                    if response.status_code != expected:
+                        self.stderr.write(f'{name}：状态码 {response.status_code}，预期 {expected}')
+                        break
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{name:<6} {elapsed / options["requests"] * 1000:8.2f} ms/次 '
+                                  f'{options["requests"] / elapsed:8.1f} 次/s '
+                                  f'{queries / options["requests"]:.1f} 条 SQL/次')
+            transaction.set_rollback(True)
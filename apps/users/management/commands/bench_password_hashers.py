@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BENCH_PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = '各密码哈希策略单核的校验耗时（每次登录一次校验）和注册耗时，用于估算登录容量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10, help='每种策略的校验次数')
+        parser.add_argument('--policy', choices=list(settings.PASSWORD_HASH_POLICIES), action='append',
+                            help='只测试指定策略，可重复，默认全部')
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        for policy in options['policy'] or settings.PASSWORD_HASH_POLICIES:
+            hasher = import_string(settings.PASSWORD_HASH_POLICIES[policy])()
+            current = '（当前）' if policy == settings.PASSWORD_HASH_POLICY else ''
+            try:
+                start = time.perf_counter()
+                encoded = hasher.encode(BENCH_PASSWORD, hasher.salt())
+                encode_time = time.perf_counter() - start
+            except ValueError as e:
+                # 依赖库未安装
+                self.stdout.write(f'{policy}{current}：跳过，{e}')
+                continue
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                hasher.verify(BENCH_PASSWORD, encoded)
+            verify_time = (time.perf_counter() - start) / rounds
+
+            self.stdout.write(f'{policy}{current} {settings.PASSWORD_HASH_COST[policy]}\n'
+                              f'    注册 {encode_time * 1000:.1f} ms，登录 {verify_time * 1000:.1f} ms，'
+                              f'{1 / verify_time:.1f} 次登录/秒/核')
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_rename_verifycord_verifycode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['mobile'], name='users_mobile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verifycode',
+            index=models.Index(fields=['mobile', 'add_time'], name='verifycode_mobile_time_idx'),
+        ),
+    ]
@@ -20,6 +20,10 @@ class UserProfile(AbstractUser):
     class Meta:
         verbose_name = '用户信息'
         verbose_name_plural = verbose_name
+        indexes = [
+            # 手机号登录、注册时校验手机号是否已注册
+            models.Index(fields=['mobile'], name='users_mobile_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -34,6 +38,10 @@ class VerifyCode(models.Model):
     class Meta:
         verbose_name = '短信验证'
         verbose_name_plural = verbose_name
+        indexes = [
+            # 按手机号取最近的验证码、发送频率校验
+            models.Index(fields=['mobile', 'add_time'], name='verifycode_mobile_time_idx'),
+        ]
 
     def __str__(self):
         return self.code
@@ -1,10 +1,12 @@
 import re
-from datetime import datetime, timedelta
 
+from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from users.models import VerifyCode, UserProfile
+from users.models import UserProfile
+from users.verify import mobile_limiter, ip_limiter, check_code, delete_code, CODE_OK, CODE_EXPIRED
+from utils.ratelimit import get_client_ip
 from MxShop.settings import REGEX_MOBILE
 
 
@@ -19,20 +21,21 @@ class SmsSerializer(serializers.Serializer):
         :return:
         """
         # 手机号是否已注册
-        if UserProfile.objects.filter(mobile=mobile).count():
+        if UserProfile.objects.filter(mobile=mobile).exists():
             raise serializers.ValidationError("用户已存在")
 
         # 手机号格式是否合法
         if not re.match(REGEX_MOBILE, mobile):
             raise serializers.ValidationError("手机号格式非法")
 
-        # 验证码频率，1min 只能发一次
-        one_min_time = datetime.now() - timedelta(hours=0, minutes=1, seconds=0)
-
-        # 从数据库中取出验证码，view 中生成验证码并发送成功后，会将验证码存储到 VerifyCode 模型中，这里只需取出验证时间即可
-        if VerifyCode.objects.filter(add_time__gt=one_min_time, mobile=mobile).count():
+        # 验证码频率：每个手机号 1min 只能发一次，每个 IP 限制发送次数（缓存中的滑动窗口计数，不查数据库）
+        if not mobile_limiter().hit(mobile):
             raise serializers.ValidationError("距离上一次发送未超过60s")
 
+        request = self.context.get('request')
+        if request is not None and not ip_limiter().hit(get_client_ip(request)):
+            raise serializers.ValidationError("发送过于频繁，请稍后再试")
+
         return mobile
 
 
@@ -54,34 +57,31 @@ class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(style={'input_type': 'password'}, label="密码", write_only=True)
 
     def create(self, validated_data):
-        """密码加密保存"""
+        """
+        密码加密保存
+        password_hash 为预先计算的密码哈希（异步注册在线程池中计算，见 users.views.register），没有时在这里计算
+        """
+        password = validated_data.pop('password')
+        validated_data['password'] = validated_data.pop('password_hash', None) or make_password(password)
         user = super(UserSerializer, self).create(validated_data=validated_data)
-        user.set_password(validated_data['password'])
-        user.save()
+        # 注册成功，验证码作废
+        delete_code(user.mobile)
         return user
 
     def validate_code(self, code):
         """
         验证验证码
         post 数据都保存在 initial_data 里，username 为用户注册的手机号，验证码
-        按添加时间倒序排序，为了后面验证过期，错误等
+        与缓存中该手机号最近一次发送的验证码比较，验证过期，错误等
         :param code:
         :return:
         self.initial_data：{'password': 'abcd110139', 'username': '18674447633', 'code': '6188'}
         """
-        verify_records = VerifyCode.objects.filter(mobile=self.initial_data['mobile']).order_by('-add_time')
-
-        if verify_records:
-            # 最近的一个验证码
-            last_record = verify_records[0]
-            # 有效期为 5 min
-            five_mintues_ago = datetime.now() - timedelta(hours=0, minutes=5, seconds=0)
-            if five_mintues_ago > last_record.add_time.replace(tzinfo=None):
-                raise serializers.ValidationError('验证码过期！')
-
-            if last_record.code != code:
-                raise serializers.ValidationError(f'验证码错误！')
-        else:
+        # 只读取最近一次的验证码（共享缓存，未命中时按索引查询一条），校验开销与历史发送次数无关
+        result = check_code(self.initial_data.get('mobile'), code)
+        if result == CODE_EXPIRED:
+            raise serializers.ValidationError('验证码过期！')
+        if result != CODE_OK:
             raise serializers.ValidationError('验证码错误！')
 
     def validate(self, attrs):
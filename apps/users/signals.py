@@ -0,0 +1,11 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from users.authentication import invalidate_user
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def clear_cached_user(sender, instance=None, **kwargs):
+    """用户保存（修改密码、停用等）、删除后，清除 JWT 认证缓存的用户"""
+    invalidate_user(instance.pk)
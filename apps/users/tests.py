@@ -1,3 +1,420 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, \
+    override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from MxShop.urls import router
+from users.hashers import PBKDF2PasswordHasher
+from users.models import VerifyCode
+from users.serializers import SmsSerializer
+from users.views import CustomBackend, SmsCodeViewSet, UserCreateViewSet, login, register, save_verify_code, \
+    send_sms_code
+from users.verify import save_code, check_code, delete_code, CODE_OK, CODE_EXPIRED, CODE_INVALID, \
+    VERIFY_CODE_CACHE_KEY
+from utils.sms import get_sms_dispatcher, SmsDispatcher, StubTransport, YunPianTransport, SmsTransportError
+from utils.testing import LOCMEM_CACHES, FILE_CACHES, SharedDatabaseMixin
+
+User = get_user_model()
+
+MOBILE = '13800000000'
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SettingsOverrideTest(TestCase):
+    """可替换的组件在 override_settings 后按新配置重新创建"""
+
+    def test_sms_transport(self):
+        with override_settings(SMS_TRANSPORT='utils.sms.StubTransport'):
+            self.assertIsInstance(get_sms_dispatcher().transport, StubTransport)
+        with override_settings(SMS_TRANSPORT='utils.sms.YunPianTransport'):
+            self.assertNotIsInstance(get_sms_dispatcher().transport, StubTransport)
+
+    def test_hash_cost(self):
+        with override_settings(PASSWORD_HASH_COST={'pbkdf2': {'iterations': 1000}}):
+            self.assertEqual(PBKDF2PasswordHasher().iterations, 1000)
+
+
+def gateway_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+    return response
+
+
+class YunPianTest(SimpleTestCase):
+    """云片网关的错误处理"""
+
+    def setUp(self):
+        self.transport = YunPianTransport()
+        self.yun_pian = self.transport.yun_pian
+        self.post = mock.patch.object(self.yun_pian.session, 'post').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_rejected(self):
+        # 4xx 是网关拒绝了请求：返回失败，不重试，不计入熔断
+        self.post.return_value = gateway_response(400, {'code': 2, 'msg': '请求参数格式错误'})
+        self.assertEqual(self.transport.send('1234', '13800000000'), (False, '请求参数格式错误'))
+        self.post.return_value = gateway_response(403, 'Forbidden')
+        self.assertEqual(self.yun_pian.send_sms('1234', '13800000000'), {'code': 403, 'msg': 'Forbidden'})
+        self.assertEqual(self.yun_pian.circuit_breaker._failures, 0)
+
+    def test_unavailable(self):
+        # 5xx、网络错误是网关故障：抛出可重试的错误，计入熔断
+        self.post.return_value = gateway_response(502, 'Bad Gateway')
+        with self.assertRaises(SmsTransportError):
+            self.transport.send('1234', '13800000000')
+        self.post.side_effect = requests.ConnectionError
+        with self.assertRaises(SmsTransportError):
+            self.transport.send('1234', '13800000000')
+        self.assertEqual(self.yun_pian.circuit_breaker._failures, 2)
+
+    def test_sent(self):
+        self.post.return_value = gateway_response(200, {'code': 0, 'msg': '发送成功'})
+        self.assertEqual(self.transport.send('1234', '13800000000'), (True, '发送成功'))
+
+
+class FlakyTransport(StubTransport):
+    """前 failures 次发送抛出临时错误"""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    def send(self, code, mobile):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise SmsTransportError('网关超时')
+        return super().send(code, mobile)
+
+
+class SmsDispatcherTest(SimpleTestCase):
+    """短信发送队列的重试"""
+
+    def setUp(self):
+        self.sleep = mock.patch('utils.sms.time.sleep').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def send(self, transport):
+        dispatcher = SmsDispatcher(transport, max_workers=1, max_retries=3, backoff=0.5)
+        self.addCleanup(dispatcher.executor.shutdown)
+        callback = mock.Mock()
+        result = dispatcher.submit('1234', MOBILE, callback=callback).result(timeout=10)
+        return result, callback
+
+    def test_retry(self):
+        # 临时错误按指数退避重试，成功后停止
+        transport = FlakyTransport(2)
+        result, callback = self.send(transport)
+        self.assertEqual(result, (True, '发送成功'))
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0])
+        self.assertEqual(transport.outbox, [(MOBILE, '1234')])
+        callback.assert_called_once_with('1234', MOBILE, True, '发送成功')
+
+    def test_give_up(self):
+        # 重试 max_retries 次后放弃，回调收到失败结果
+        transport = FlakyTransport(10)
+        with self.assertLogs('utils.sms', 'WARNING'):
+            result, callback = self.send(transport)
+        self.assertEqual(result, (False, '网关超时'))
+        self.assertEqual(transport.attempts, 4)
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0, 2.0])
+        callback.assert_called_once_with('1234', MOBILE, False, '网关超时')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SmsCallbackTest(SharedDatabaseMixin, TransactionTestCase):
+    """发送成功后回调保存验证码（回调在发送线程中执行，需要提交的数据）"""
+
+    def test_save_verify_code(self):
+        dispatcher = SmsDispatcher(FlakyTransport(1), max_workers=1, backoff=0)
+        self.addCleanup(dispatcher.executor.shutdown)
+        dispatcher.submit('1234', MOBILE, callback=save_verify_code).result(timeout=10)
+        self.assertEqual(check_code(MOBILE, '1234'), CODE_OK)
+        self.assertTrue(VerifyCode.objects.filter(mobile=MOBILE, code='1234').exists())
+
+        # 发送失败不保存
+        dispatcher = SmsDispatcher(FlakyTransport(10), max_workers=1, max_retries=1, backoff=0)
+        self.addCleanup(dispatcher.executor.shutdown)
+        with self.assertLogs('utils.sms', 'WARNING'):
+            dispatcher.submit('5678', '13900000000', callback=save_verify_code).result(timeout=10)
+        self.assertFalse(VerifyCode.objects.filter(mobile='13900000000').exists())
+
+
+class VerifyCodeTest(TestCase):
+    """验证码的保存和校验"""
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(CACHES=FILE_CACHES)
+    def test_shared_cache(self):
+        save_code(MOBILE, '1234')
+        # 命中共享缓存，不查询数据库
+        with self.assertNumQueries(0):
+            self.assertEqual(check_code(MOBILE, '1234'), CODE_OK)
+        self.assertEqual(check_code(MOBILE, '4321'), CODE_INVALID)
+
+        # 缓存被淘汰时按数据库中最近一条校验
+        cache.delete(VERIFY_CODE_CACHE_KEY.format(mobile=MOBILE))
+        with self.assertNumQueries(1):
+            self.assertEqual(check_code(MOBILE, '1234'), CODE_OK)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache(self):
+        # 进程内缓存中的验证码可能已被其他进程重新发送的覆盖，以数据库为准
+        cache.set(VERIFY_CODE_CACHE_KEY.format(mobile=MOBILE), ('1111', 0))
+        save_code(MOBILE, '1234')
+        self.assertEqual(check_code(MOBILE, '1234'), CODE_OK)
+        self.assertEqual(check_code(MOBILE, '1111'), CODE_INVALID)
+
+    @override_settings(CACHES=FILE_CACHES)
+    def test_expired_and_deleted(self):
+        save_code(MOBILE, '1234')
+        VerifyCode.objects.update(add_time=VerifyCode.objects.get().add_time - timedelta(minutes=10))
+        cache.clear()
+        self.assertEqual(check_code(MOBILE, '1234'), CODE_EXPIRED)
+
+        save_code(MOBILE, '5678')
+        delete_code(MOBILE)
+        self.assertEqual(check_code(MOBILE, '5678'), CODE_INVALID)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SMS_RATE_LIMITS={'mobile_interval': 60, 'ip': (1, 60 * 60)})
+class SmsRateLimitTest(TestCase):
+    """发送验证码按请求方 IP 限流"""
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, mobile, forwarded_for):
+        request = RequestFactory().post('/codes/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+        return SmsSerializer(data={'mobile': mobile}, context={'request': request}).is_valid()
+
+    def test_remote_addr(self):
+        # 未配置代理时不信任 X-Forwarded-For，经同一代理的请求共用限额
+        self.assertTrue(self.send('13800000001', '1.1.1.1'))
+        self.assertFalse(self.send('13800000002', '2.2.2.2'))
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_forwarded_for(self):
+        self.assertTrue(self.send('13800000001', '1.1.1.1'))
+        self.assertTrue(self.send('13800000002', '2.2.2.2'))
+        # 客户端自己添加的 X-Forwarded-For 不影响代理追加的地址
+        self.assertFalse(self.send('13800000003', '3.3.3.3, 1.1.1.1'))
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    """JWT 认证缓存用户"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='password')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def get_orders(self):
+        """请求订单列表，返回状态码和查询用户表的次数"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/orders/', HTTP_ACCEPT='application/json',
+                                       HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return response.status_code, sum(User._meta.db_table in query['sql'] for query in ctx.captured_queries)
+
+    @override_settings(CACHES=FILE_CACHES)
+    def test_shared_cache(self):
+        self.assertEqual(self.get_orders(), (200, 1))
+        self.assertEqual(self.get_orders(), (200, 0))
+
+        # 停用后缓存被清除，其他进程也重新查询
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_orders()[0], 401)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_process_local_cache(self):
+        # 其他进程清除不了本进程的缓存，不缓存用户
+        self.assertEqual(self.get_orders(), (200, 1))
+        self.assertEqual(self.get_orders(), (200, 1))
+
+
+class CustomBackendTest(TestCase):
+    """用户名、手机号登录，每次一条查询"""
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(username='buyer', mobile=MOBILE, password='password')
+        # 手机号注册的用户 username 为手机号，之后可能修改了手机号
+        self.moved = User.objects.create_user(username='13900000000', mobile='13700000000', password='password')
+        self.backend = CustomBackend()
+
+    def test_login_user(self):
+        cases = (('buyer', self.buyer), (MOBILE, self.buyer), ('13900000000', self.moved),
+                 ('13700000000', self.moved), ('13600000000', None), ('nobody', None))
+        for username, user in cases:
+            with self.subTest(username=username), self.assertNumQueries(1):
+                self.assertEqual(self.backend.get_login_user(username), user)
+
+    def test_prefer_mobile(self):
+        # 登录名既是一个用户的手机号又是另一个用户的用户名时，按手机号
+        other = User.objects.create_user(username=MOBILE, password='password')
+        self.assertEqual(self.backend.get_login_user(MOBILE), self.buyer)
+        # 手机号对应多个用户时无法确定，按用户名
+        User.objects.create_user(username='buyer2', mobile=MOBILE, password='password')
+        self.assertEqual(self.backend.get_login_user(MOBILE), other)
+
+    def test_authenticate(self):
+        self.assertEqual(self.backend.authenticate(None, username=MOBILE, password='password'), self.buyer)
+        self.assertIsNone(self.backend.authenticate(None, username=MOBILE, password='wrong'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncLoginTest(SharedDatabaseMixin, TransactionTestCase):
+    """异步登录视图与 TokenObtainPairView 一致（校验在线程池中执行，需要提交的数据）"""
+
+    def setUp(self):
+        User.objects.create_user(username='buyer', mobile='13800000000', password='password')
+
+    def post(self, data):
+        """分别请求异步视图和 TokenObtainPairView"""
+        body = json.dumps(data)
+        response = async_to_sync(login)(AsyncRequestFactory().post('/login/', body, content_type='application/json'))
+        expected = TokenObtainPairView.as_view()(RequestFactory().post('/login/', body, content_type='application/json'))
+        return response, expected.render()
+
+    def test_login(self):
+        for username in ('buyer', '13800000000'):
+            response, _ = self.post({'username': username, 'password': 'password'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(json.loads(response.content)), {'refresh', 'access'})
+
+    def test_errors(self):
+        for data in ({'username': 'buyer'}, {'username': 'buyer', 'password': 'wrong'}):
+            response, expected = self.post(data)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+            self.assertEqual(response.get('WWW-Authenticate'), expected.get('WWW-Authenticate'))
+
+    def test_login_failed_signal(self):
+        # 经 authenticate() 校验，登录失败时发送信号
+        handler = mock.Mock()
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.post({'username': 'buyer', 'password': 'wrong'})
+        # 异步视图和 TokenObtainPairView 各发送一次
+        self.assertEqual(handler.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncRegisterTest(TestCase):
+    """异步注册视图与 UserCreateViewSet 一致"""
+
+    def setUp(self):
+        cache.clear()
+        save_code(MOBILE, '1234')
+
+    def post(self, data):
+        body = json.dumps(data)
+        response = async_to_sync(register)(AsyncRequestFactory().post('/users/', body, content_type='application/json'))
+        view = UserCreateViewSet.as_view({'post': 'create'})
+        expected = view(RequestFactory().post('/users/', body, content_type='application/json'))
+        return response, expected.render()
+
+    def test_register(self):
+        data = {'username': MOBILE, 'mobile': MOBILE, 'code': '1234', 'password': 'password'}
+        response = async_to_sync(register)(
+            AsyncRequestFactory().post('/users/', json.dumps(data), content_type='application/json'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), {'username': MOBILE, 'mobile': MOBILE})
+        self.assertTrue(User.objects.get(username=MOBILE).check_password('password'))
+        # 验证码已作废
+        self.assertEqual(check_code(MOBILE, '1234'), CODE_INVALID)
+
+    def test_errors(self):
+        User.objects.create_user(username='13900000000', password='password')
+        cases = (
+            {'username': MOBILE, 'mobile': MOBILE, 'code': '4321', 'password': 'password'},
+            {'username': MOBILE, 'mobile': MOBILE, 'code': '1234'},
+            {'username': '13900000000', 'mobile': MOBILE, 'code': '1234', 'password': 'password'},
+        )
+        for data in cases:
+            with self.subTest(data=data):
+                response, expected = self.post(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertFalse(User.objects.filter(mobile=MOBILE).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncSmsCodeTest(TestCase):
+    """异步发送验证码视图与 SmsCodeViewSet 一致"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('users.views.get_sms_dispatcher')
+        self.dispatcher = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def send(self, data):
+        body = json.dumps(data)
+        return async_to_sync(send_sms_code)(AsyncRequestFactory().post('/code/', body, content_type='application/json'))
+
+    def send_drf(self, data):
+        view = SmsCodeViewSet.as_view({'post': 'create'})
+        return view(RequestFactory().post('/code/', json.dumps(data), content_type='application/json')).render()
+
+    def test_send(self):
+        response = self.send({'mobile': MOBILE})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), {'mobile': MOBILE})
+        (code, mobile), kwargs = self.dispatcher.submit.call_args
+        self.assertRegex(code, r'^\d{4}$')
+        self.assertEqual((mobile, kwargs), (MOBILE, {'callback': save_verify_code}))
+
+    def test_errors(self):
+        User.objects.create_user(username='buyer', mobile='13900000000', password='password')
+        for data in ({'mobile': '1380000'}, {}, {'mobile': '13900000000'}):
+            with self.subTest(data=data):
+                response, expected = self.send(data), self.send_drf(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.dispatcher.submit.assert_not_called()
+
+    def test_rate_limit(self):
+        self.assertEqual(self.send({'mobile': MOBILE}).status_code, 201)
+        # 同一手机号 60s 内只能发送一次，两种视图共用限流计数
+        response, expected = self.send({'mobile': MOBILE}), self.send_drf({'mobile': MOBILE})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(self.dispatcher.submit.call_count, 1)
+
+
+class AsyncViewMethodTest(TestCase):
+    """异步视图的 OPTIONS 与对应的 DRF 视图一致，其他方法返回 405"""
+
+    def test_options(self):
+        router_views = {pattern.name: pattern.callback for pattern in router.urls}
+        cases = (('/login/', TokenObtainPairView.as_view()), ('/users/', router_views['users-list']),
+                 ('/code/', router_views['code-list']))
+        for url, drf_view in cases:
+            with self.subTest(url=url):
+                response = self.client.options(url)
+                expected = drf_view(RequestFactory().options(url)).render()
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Allow'], 'POST, OPTIONS')
+                self.assertEqual(response.json(), json.loads(expected.content))
+
+    def test_method_not_allowed(self):
+        response = self.client.get('/code/')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'POST, OPTIONS')
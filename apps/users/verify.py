@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from users.models import VerifyCode
+from utils.cache import is_shared_cache
+from utils.ratelimit import SlidingWindowRateLimiter, IntervalRateLimiter
+
+VERIFY_CODE_CACHE_KEY = 'users:verify_code:{mobile}'
+
+# 验证码有效期 5 min；缓存、数据库保留更久，用于区分“过期”和“错误”
+VERIFY_CODE_EXPIRE = 60 * 5
+VERIFY_CODE_CACHE_TIMEOUT = 60 * 30
+
+CODE_OK = 'ok'
+CODE_EXPIRED = 'expired'
+CODE_INVALID = 'invalid'
+
+
+def mobile_limiter():
+    """发送验证码的限流：每个手机号，参数取自 SMS_RATE_LIMITS"""
+    return IntervalRateLimiter('sms:mobile', settings.SMS_RATE_LIMITS['mobile_interval'])
+
+
+def ip_limiter():
+    """发送验证码的限流：每个 IP，参数取自 SMS_RATE_LIMITS"""
+    return SlidingWindowRateLimiter('sms:ip', *settings.SMS_RATE_LIMITS['ip'])
+
+
+def save_code(mobile, code):
+    """
+    保存手机号最近一次发送的验证码：写入 VerifyCode 表（发送记录，也是缓存未命中时的依据），
+    共享缓存中同时保存一份，覆盖之前的
+    """
+    verify_code = VerifyCode.objects.create(code=code, mobile=mobile)
+    if is_shared_cache():
+        cache.set(VERIFY_CODE_CACHE_KEY.format(mobile=mobile), (code, verify_code.add_time.timestamp()),
+                  timeout=VERIFY_CODE_CACHE_TIMEOUT)
+
+
+def get_last_code(mobile):
+    """
+    手机号最近一次发送的 (验证码, 发送时间戳)：先读共享缓存；
+    未命中（过期、被淘汰）或缓存为进程内缓存（可能是其他进程发送的验证码）时，
+    按 (mobile, add_time) 索引取最近一条 VerifyCode，与历史发送次数无关
+    """
+    if is_shared_cache():
+        record = cache.get(VERIFY_CODE_CACHE_KEY.format(mobile=mobile))
+        if record is not None:
+            return record
+    verify_code = VerifyCode.objects.filter(mobile=mobile).order_by('-add_time').only('code', 'add_time').first()
+    if verify_code is None:
+        return None
+    return verify_code.code, verify_code.add_time.timestamp()
+
+
+def check_code(mobile, code):
+    """
+    校验验证码
+    :return: CODE_OK / CODE_EXPIRED / CODE_INVALID
+    """
+    record = get_last_code(mobile)
+    if record is None:
+        return CODE_INVALID
+
+    last_code, send_time = record
+    if time.time() - send_time > VERIFY_CODE_EXPIRE:
+        return CODE_EXPIRED
+    if last_code != code:
+        return CODE_INVALID
+    return CODE_OK
+
+
+def delete_code(mobile):
+    """验证码使用后作废，缓存和数据库中的都删除"""
+    VerifyCode.objects.filter(mobile=mobile).delete()
+    cache.delete(VERIFY_CODE_CACHE_KEY.format(mobile=mobile))
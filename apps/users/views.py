@@ -1,42 +1,88 @@
+import json
 import random
+import re
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections
 from django.db.models import Q
+from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework import viewsets, status
+from rest_framework.exceptions import APIException, MethodNotAllowed, ParseError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.mixins import CreateModelMixin, RetrieveModelMixin, UpdateModelMixin
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
 
-from MxShop.settings import APIKEY
-from users.models import VerifyCode
+from MxShop.settings import REGEX_MOBILE
+from users.authentication import CachedJWTAuthentication
+from users.hashers import run_in_hash_pool
 from users.serializers import SmsSerializer, UserSerializer, UserDetailSerializer
-from utils.yunpian import YunPian
+from users.verify import save_code
+from utils.renderers import dumps
+from utils.sms import get_sms_dispatcher
 
 User = get_user_model()
 
 
 class CustomBackend(ModelBackend):
-    """自定义用户验证"""
+    """
+    自定义用户验证：用户名和手机号都能登录
+    手机号格式的登录名一次查询 username OR mobile（MySQL 用 index_merge 合并 username 唯一索引和 mobile 索引），
+    其他登录名只按 username 查询
+    """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # 使得用户名和手机号都能登录
-            user = User.objects.get(
-                Q(username=username) | Q(mobile=username)
-            )
-            if user.check_password(password):
-                return user
-        except Exception as e:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
             return None
 
+        user = self.get_login_user(username)
+        if user is None:
+            # 与 ModelBackend 一致：用户不存在时也计算一次哈希，不能通过响应时间判断用户是否存在
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_login_user(self, username):
+        """
+        按登录名（用户名或手机号）查询用户，查不到返回 None
+        手机号注册的用户 username 也是手机号；一个手机号对应唯一用户时按手机号登录，否则按用户名
+        """
+        if not re.match(REGEX_MOBILE, username):
+            try:
+                return User._default_manager.get_by_natural_key(username)
+            except User.DoesNotExist:
+                return None
+
+        users = list(User._default_manager.filter(Q(mobile=username) | Q(**{User.USERNAME_FIELD: username})))
+        by_mobile = [user for user in users if user.mobile == username]
+        if len(by_mobile) == 1:
+            return by_mobile[0]
+        return next((user for user in users if user.get_username() == username), None)
+
+
+def save_verify_code(code, mobile, success, msg):
+    """
+    短信发送结果回调：发送成功，保存验证码用于注册校验（见 users.verify.save_code）
+    """
+    if success:
+        save_code(mobile, code)
+
 
 class SmsCodeViewSet(CreateModelMixin, viewsets.GenericViewSet):
     """手机验证码"""
     serializer_class = SmsSerializer
 
-    def generate_code(self):
+    @staticmethod
+    def generate_code():
         """生成四位数字的验证码"""
         seeds = "1234567890"
         random_str = []
@@ -48,7 +94,7 @@ class SmsCodeViewSet(CreateModelMixin, viewsets.GenericViewSet):
     def create(self, request, *args, **kwargs):
         """
         创建验证码
-        发送验证码
+        发送验证码（后台队列异步发送）
         发送成功将验证码、手机号存储到模型中
         """
         serializer = self.get_serializer(data=request.data)
@@ -57,29 +103,15 @@ class SmsCodeViewSet(CreateModelMixin, viewsets.GenericViewSet):
 
         mobile = serializer.validated_data["mobile"]
 
-        yun_pian = YunPian(APIKEY)
         # 生成验证码
         code = self.generate_code()
 
-        # 发送短信验证码
-        sms_status = yun_pian.send_sms(code=code, mobile=mobile)
-
-        # 这段不需要添加（临时添加的）
-        # code_record = VerifyCode(code=code, mobile=mobile)
-        # code_record.save()
+        # 提交到后台队列发送，不阻塞当前请求；发送成功后由回调保存验证码
+        get_sms_dispatcher().submit(code, mobile, callback=save_verify_code)
 
-        # 短信验证码发送失败
-        if sms_status["code"] != 0:
-            return Response({
-                "mobile": sms_status["msg"]
-            }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            # 发送成功，保存到数据库中
-            code_record = VerifyCode(code=code, mobile=mobile)
-            code_record.save()
-            return Response({
-                "mobile": mobile
-            }, status=status.HTTP_201_CREATED)
+        return Response({
+            "mobile": mobile
+        }, status=status.HTTP_201_CREATED)
 
 
 class UserCreateViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin, viewsets.GenericViewSet):
@@ -88,7 +120,7 @@ class UserCreateViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
     """
     serializer_class = UserSerializer
     queryset = User.objects.all()
-    authentication_classes = (JWTAuthentication, SessionAuthentication)
+    authentication_classes = (CachedJWTAuthentication, SessionAuthentication)
 
     def get_permissions(self):
         """
@@ -122,3 +154,118 @@ class UserCreateViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
         """
         return self.request.user  # 即当前登录用户
 
+
+# 异步视图：ASGI 部署时，密码哈希在线程池中计算，数据库操作经 sync_to_async 执行，
+# 等待期间事件循环继续处理其他请求；WSGI 下 Django 自动转为同步执行，行为相同
+# 请求、响应格式与对应的 DRF 视图一致（login/：TokenObtainPairView，users/：注册，code/：发送验证码）
+
+def async_csrf_exempt(view):
+    """csrf_exempt 在 Django 4.0 中会把异步视图包装为同步函数，这里只设置标记"""
+    view.csrf_exempt = True
+    return view
+
+
+def parse_body(request):
+    """解析 JSON 或表单请求体，格式错误返回 None"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def json_response(data, status_code):
+    return HttpResponse(dumps(data), status=status_code, content_type='application/json')
+
+
+# OPTIONS 请求交给对应的 DRF 视图，返回相同的元数据（字段说明、Allow 头）
+login_options_view = TokenObtainPairView.as_view()
+register_options_view = UserCreateViewSet.as_view({'post': 'create'}, basename='users', detail=False, suffix='List')
+sms_code_options_view = SmsCodeViewSet.as_view({'post': 'create'}, basename='code', detail=False, suffix='List')
+
+
+async def preflight(request, options_view):
+    """
+    只接受 POST 和可解析的请求体，返回 (data, 错误响应)
+    OPTIONS 请求由 options_view（对应的 DRF 视图）响应
+    """
+    if request.method == 'OPTIONS':
+        return None, await sync_to_async(lambda: options_view(request).render())()
+    if request.method != 'POST':
+        response = json_response({'detail': MethodNotAllowed.default_detail.format(method=request.method)},
+                                 status.HTTP_405_METHOD_NOT_ALLOWED)
+        response['Allow'] = 'POST, OPTIONS'
+        return None, response
+    data = parse_body(request)
+    if data is None:
+        return None, json_response({'detail': ParseError.default_detail}, status.HTTP_400_BAD_REQUEST)
+    return data, None
+
+
+def validate_login(serializer):
+    """与 TokenObtainPairView.post 相同的校验，在密码哈希线程池中执行，结束后关闭失效的数据库连接"""
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError as e:
+        raise InvalidToken(e.args[0])
+    finally:
+        close_old_connections()
+
+
+@async_csrf_exempt
+async def login(request):
+    """
+    登录，返回 refresh、access token
+    与 TokenObtainPairView 一样由序列化器调用 authenticate()：经过 AUTHENTICATION_BACKENDS，
+    发送 user_logged_in / user_login_failed 信号，哈希策略变更时重新哈希密码；
+    查询用户、校验密码整体在线程池中执行，不阻塞事件循环
+    """
+    data, error = await preflight(request, login_options_view)
+    if error:
+        return error
+
+    view = TokenObtainPairView()
+    serializer = view.get_serializer_class()(data=data, context={'request': request})
+    try:
+        await run_in_hash_pool(validate_login, serializer)
+    except APIException as exc:
+        # 与 DRF 视图的错误响应一致
+        response = json_response(exception_handler(exc, {}).data, exc.status_code)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = view.get_authenticate_header(request)
+        return response
+    return json_response(serializer.validated_data, status.HTTP_200_OK)
+
+
+@async_csrf_exempt
+async def register(request):
+    """用户注册：数据校验、保存经 sync_to_async 执行，密码哈希在线程池中计算"""
+    data, error = await preflight(request, register_options_view)
+    if error:
+        return error
+
+    serializer = UserSerializer(data=data, context={'request': request})
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    password_hash = await run_in_hash_pool(make_password, serializer.validated_data['password'])
+    await sync_to_async(serializer.save)(password_hash=password_hash)
+    return json_response(serializer.data, status.HTTP_201_CREATED)
+
+
+@async_csrf_exempt
+async def send_sms_code(request):
+    """发送验证码：校验经 sync_to_async 执行，短信由后台队列异步发送"""
+    data, error = await preflight(request, sms_code_options_view)
+    if error:
+        return error
+
+    serializer = SmsSerializer(data=data, context={'request': request})
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    mobile = serializer.validated_data['mobile']
+    get_sms_dispatcher().submit(SmsCodeViewSet.generate_code(), mobile, callback=save_verify_code)
+    return json_response({'mobile': mobile}, status.HTTP_201_CREATED)
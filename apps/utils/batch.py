@@ -0,0 +1,27 @@
+def iter_id_chunks(queryset, chunk_size=1000):
+    """
+    按主键分批遍历 queryset，每批返回一个 id 列表
+    用 id > 上一批最大 id 定位下一批（不使用 OFFSET），每批都是一次索引范围查询
+    """
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def iter_chunks(queryset, chunk_size=1000):
+    """
+    按主键分批读取 queryset 的记录（模型实例或 values() 字典），每批一次索引范围查询，
+    内存中只保留当前一批（MySQL 驱动默认会缓存整个结果集，iterator() 无法做到这一点）
+    """
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id')[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+        last_id = last['id'] if isinstance(last, dict) else last.id
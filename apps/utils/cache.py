@@ -0,0 +1,11 @@
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """
+    缓存是否在进程间共享：LocMemCache 每个进程各有一份，DummyCache 不保存数据，
+    需要所有进程看到同一份的数据（失效标记、版本号、租约等）不能依赖这两种缓存
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,98 @@
+import hashlib
+import time
+from urllib.parse import quote
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+
+from utils.cache import is_shared_cache
+
+VERSION_CACHE_KEY = 'conditional:version:{}'
+
+
+def _version_key(model):
+    return VERSION_CACHE_KEY.format(model._meta.label_lower)
+
+
+def touch(*models):
+    """
+    更新表的版本号（最后修改时间，毫秒时间戳，单调递增），
+    表中数据变更后调用（save / delete 由 signals 调用，批量 update 需手动调用）。
+    在事务中调用时，事务提交后才更新，避免新版本号对应到未提交的旧数据
+    """
+    keys = [_version_key(model) for model in models]
+
+    def update():
+        now = int(time.time() * 1000)
+        versions = cache.get_many(keys)
+        cache.set_many({key: max(now, versions.get(key, 0) + 1) for key in keys}, None)
+
+    transaction.on_commit(update)
+
+
+def get_version(models):
+    """
+    多个表中最大的版本号，一次缓存读取，不查询数据库。
+    没有记录（缓存重启、被淘汰）的表以当前时间初始化，旧的校验值随之失效，不会误返回 304
+    """
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return max(versions.values())
+
+
+class ConditionalGetMixin:
+    """
+    list / retrieve 支持条件请求：响应带 ETag（弱校验）和 Last-Modified，
+    请求带 If-None-Match / If-Modified-Since 且未变更时直接返回 304，不查询数据、不序列化。
+    校验值取自 conditional_models 中各表的版本号（见 touch），而不是对响应内容做哈希；
+    点击数等计数器的缓冲增量不会改变版本号，写入数据库时才会，所以使用弱 ETag。
+    版本号需要所有进程看到同一份，缓存不在进程间共享（LocMemCache 等）时不支持条件请求
+    """
+    conditional_models = ()
+
+    def get_conditional_validators(self, request):
+        """
+        ETag 包含对象的 lookup 值和查询参数，不同对象、不同页的校验值不同：
+        带着其他对象的 ETag 请求不存在的对象仍会执行视图，返回 404。
+        Last-Modified 无法区分对象，只用于列表；详情返回 None，If-Modified-Since 不会跳过对象是否存在的检查
+        """
+        version = get_version(self.conditional_models)
+        # 同一地址的 JSON 和可浏览 API 页面内容不同，ETag 也要不同
+        parts = [self.basename, self.action, request.accepted_renderer.format]
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or getattr(self, 'lookup_field', None)
+        if lookup_url_kwarg in self.kwargs:
+            parts.append(quote(str(self.kwargs[lookup_url_kwarg]), safe=''))
+        query = request.META.get('QUERY_STRING')
+        if query:
+            parts.append(hashlib.md5(query.encode()).hexdigest()[:12])
+        etag = f'W/"{"-".join(parts)}-{version}"'
+        last_modified = None if self.detail else version // 1000
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not is_shared_cache():
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_conditional_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,96 @@
+from utils.db.pool import ConnectionPool, get_pool
+
+
+class ConnectionManagementMixin:
+    """
+    数据库后端 DatabaseWrapper 的扩展，DATABASES 中的配置项：
+    CONN_HEALTH_CHECKS：每个请求第一次使用复用的持久连接（CONN_MAX_AGE > 0）前先 SELECT 1，
+        已断开（MySQL wait_timeout、重启）时重新连接，而不是让请求报错
+    POOL：进程内连接池，{'SIZE', 'MAX_OVERFLOW', 'TIMEOUT', 'RECYCLE', 'PRE_PING'}，
+        连接关闭时归还连接池，下次连接时从连接池取出，不需要重新建立 TCP 连接和认证；
+        使用连接池时 CONN_MAX_AGE 一般设为 0，请求结束即归还，线程数多于连接数时也能复用
+    """
+    health_check_done = False
+    # 健康检查发现连接已断开：关闭时丢弃，不归还连接池
+    connection_broken = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def is_broken(self, conn):
+        """原始连接是否已不可用（不使用 pymysql 的 ping，它会自动重连并重置会话状态）"""
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return True
+        return False
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+
+        def factory():
+            conn_params = self.get_connection_params()
+            return ConnectionPool(
+                lambda: super(ConnectionManagementMixin, self).get_new_connection(conn_params),
+                self.is_broken,
+                size=options.get('SIZE', 5),
+                max_overflow=options.get('MAX_OVERFLOW', 10),
+                timeout=options.get('TIMEOUT', 30),
+                recycle=options.get('RECYCLE', 3600),
+                pre_ping=options.get('PRE_PING', True),
+            )
+
+        return get_pool(self.alias, factory)
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool()
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.acquire()
+
+    def _close(self):
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+        conn = self.connection
+        if self.connection_broken:
+            self.connection_broken = False
+            pool.discard(conn)
+            return
+        if self.in_atomic_block:
+            # 在事务中关闭（例如出错后），退出事务前 Django 仍持有该连接，不能交给其他线程使用
+            pool.discard(conn)
+            return
+        try:
+            # 未提交的事务回滚后再归还，下一个使用者拿到的是干净的连接
+            if not self.autocommit:
+                conn.rollback()
+        except self.Database.Error:
+            pool.discard(conn)
+        else:
+            pool.release(conn)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # 请求开始、结束时调用，复用的持久连接在下次使用前重新检查
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if self.connection is not None and not self.health_check_done and not self.in_atomic_block \
+                and self.health_check_enabled:
+            self.health_check_done = True
+            if self.is_broken(self.connection):
+                self.connection_broken = True
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,7 @@
+from django.db.backends.mysql import base
+
+from utils.db.base import ConnectionManagementMixin
+
+
+class DatabaseWrapper(ConnectionManagementMixin, base.DatabaseWrapper):
+    """MySQL 后端，支持连接健康检查和连接池，见 ConnectionManagementMixin"""
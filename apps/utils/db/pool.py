@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from utils.singleton import per_process
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """等待空闲连接超时"""
+
+
+class ConnectionPool:
+    """
+    进程内数据库连接池，连接为 DB-API 原始连接
+    size：保留的空闲连接数上限；max_overflow：高峰时可额外创建的连接数，归还时关闭；
+    timeout：连接数已满时等待空闲连接的秒数；recycle：连接最长使用秒数，超过后重新创建；
+    pre_ping：取出空闲连接时先执行 SELECT 1，已断开的连接丢弃
+    """
+
+    def __init__(self, connect, is_broken, size=5, max_overflow=10, timeout=30, recycle=3600, pre_ping=True):
+        self._connect = connect
+        self._is_broken = is_broken
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        # 空闲连接 (连接, 创建时间)，后进先出，最近用过的连接最可能仍然可用
+        self._idle = deque()
+        self._created_at = {}
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._connects = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    break
+                if self._in_use + len(self._idle) < self.size + self.max_overflow:
+                    conn = created_at = None
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f'等待数据库连接超过 {self.timeout}s（使用中 {self._in_use} 个）')
+                self._cond.wait(remaining)
+            self._in_use += 1
+            wait = time.monotonic() - start
+            self._checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+        try:
+            if conn is not None and (time.monotonic() - created_at > self.recycle
+                                     or (self.pre_ping and self._is_broken(conn))):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        """归还连接，空闲连接已达 size 时关闭（高峰时的溢出连接）"""
+        with self._cond:
+            self._in_use -= 1
+            keep = len(self._idle) < self.size
+            if keep:
+                self._idle.append((conn, self._created_at[id(conn)]))
+            self._cond.notify()
+        if not keep:
+            self._discard(conn)
+
+    def discard(self, conn):
+        """连接已不可用，关闭且不放回连接池"""
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+        self._discard(conn)
+
+    def stats(self):
+        """连接池指标：使用中、空闲连接数，等待时间（秒）等"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'connects': self._connects,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+                'wait_time_total': round(self._wait_total, 6),
+                'wait_time_avg': round(self._wait_total / self._checkouts, 6) if self._checkouts else 0,
+                'wait_time_max': round(self._wait_max, 6),
+            }
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._connects += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            logger.warning('关闭数据库连接失败', exc_info=True)
+
+
+_pools_lock = threading.Lock()
+
+
+@per_process()
+def _get_pools():
+    """当前进程的连接池 {alias: ConnectionPool}，父进程的连接不能在 fork 出的子进程中使用"""
+    return {}
+
+
+def get_pool(alias, factory):
+    """获取当前进程中数据库 alias 的连接池，不存在时用 factory() 创建"""
+    with _pools_lock:
+        pools = _get_pools()
+        if alias not in pools:
+            pools[alias] = factory()
+        return pools[alias]
+
+
+def pool_stats():
+    """当前进程各数据库连接池的指标 {alias: stats}"""
+    with _pools_lock:
+        pools = dict(_get_pools())
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from utils.db.base import ConnectionManagementMixin
+
+
+class DatabaseWrapper(ConnectionManagementMixin, base.DatabaseWrapper):
+    """SQLite 后端，支持连接健康检查和连接池，见 ConnectionManagementMixin（用于本地开发、测试）"""
@@ -0,0 +1,29 @@
+from django.db import connections, DatabaseError
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from utils.db.pool import pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_status(request):
+    """各数据库连接是否可用（SELECT 1），以及当前进程的连接池指标（使用中、空闲连接数、等待时间）"""
+    stats = pool_stats()
+    data = {}
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            usable = True
+        except DatabaseError:
+            usable = False
+        data[alias] = {
+            'vendor': connection.vendor,
+            'usable': usable,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'pool': stats.get(alias),
+        }
+    return Response(data)
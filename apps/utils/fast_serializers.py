@@ -0,0 +1,182 @@
+from collections import OrderedDict, defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from utils.batch import iter_chunks
+from utils.renderers import StreamingJSONResponse
+
+# 直接转换的字段类型，与 DRF 对应字段的 to_representation 结果一致
+_CONVERTERS = (
+    (serializers.BooleanField, bool),
+    (serializers.IntegerField, int),
+    (serializers.FloatField, float),
+    (serializers.CharField, str),
+)
+
+_plans = {}
+
+
+class _Plan:
+    """
+    一个 ModelSerializer 的预编译结果：
+    columns 为需要 .values() 读取的列，steps 为按输出顺序排列的 (字段名, 类型, 参数)
+    """
+
+    def __init__(self, serializer, model, prefix):
+        self.model = model
+        self.prefix = prefix
+        self.pk_column = prefix + model._meta.pk.name
+        self.columns = [self.pk_column]
+        self.steps = []
+        self.finalize = getattr(serializer, 'finalize', None)
+
+        if type(serializer).to_representation is not serializers.Serializer.to_representation \
+                and self.finalize is None:
+            raise ImproperlyConfigured(f'{type(serializer).__name__} 重写了 to_representation，'
+                                       f'需提供 finalize(data) 才能使用 ValuesSerializer')
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if source == '*' or '.' in source:
+                raise ImproperlyConfigured(f'ValuesSerializer 不支持字段 {name}（source={source}）')
+            column = prefix + source
+
+            if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+                # 反向外键（例如商品的 images），单独一次查询，按外键分组
+                rel = model._meta.get_field(source)
+                child = _Plan(field.child, rel.related_model, '')
+                self.steps.append((name, 'many', (child, rel.field.name)))
+            elif isinstance(field, serializers.ModelSerializer):
+                # 外键，通过 values('外键__字段') 一起读取
+                rel = model._meta.get_field(source)
+                child = _Plan(field, rel.related_model, column + '__')
+                self.columns.append(column)
+                self.columns.extend(child.columns)
+                self.steps.append((name, 'nested', (column, child)))
+            elif isinstance(field, serializers.FileField):
+                self.columns.append(column)
+                self.steps.append((name, 'file', (column, model._meta.get_field(source).storage)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                # values('外键') 得到的就是主键
+                self.columns.append(column)
+                self.steps.append((name, 'raw', (column, None)))
+            elif isinstance(field, (serializers.Serializer, serializers.ListSerializer,
+                                    serializers.SerializerMethodField, serializers.RelatedField)):
+                raise ImproperlyConfigured(f'ValuesSerializer 不支持字段 {name}（{type(field).__name__}）')
+            else:
+                converter = next((func for field_class, func in _CONVERTERS
+                                  if type(field) is field_class), field.to_representation)
+                self.columns.append(column)
+                self.steps.append((name, 'raw', (column, converter)))
+
+        # 去重并保持顺序
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def fetch_many(self, rows, related):
+        """为所有 rows 查询反向外键数据，结果存入 related[(plan, 字段名)] = {父 id: [子行]}"""
+        for name, kind, args in self.steps:
+            if kind == 'many':
+                child, fk = args
+                parent_ids = {row[self.pk_column] for row in rows if row[self.pk_column] is not None}
+                children = list(child.model.objects.filter(**{f'{fk}__in': parent_ids})
+                                .order_by(child.pk_column).values(fk, *child.columns))
+                groups = defaultdict(list)
+                for child_row in children:
+                    groups[child_row[fk]].append(child_row)
+                related[(id(self), name)] = groups
+                child.fetch_many(children, related)
+            elif kind == 'nested':
+                args[1].fetch_many(rows, related)
+
+    def build(self, row, related, request):
+        data = OrderedDict()
+        for name, kind, args in self.steps:
+            if kind == 'raw':
+                column, converter = args
+                value = row[column]
+                data[name] = value if value is None or converter is None else converter(value)
+            elif kind == 'nested':
+                column, child = args
+                data[name] = None if row[column] is None else child.build(row, related, request)
+            elif kind == 'many':
+                child, _ = args
+                data[name] = [child.build(child_row, related, request)
+                              for child_row in related[(id(self), name)].get(row[self.pk_column], ())]
+            elif kind == 'file':
+                column, storage = args
+                file_name = row[column]
+                if not file_name:
+                    data[name] = None
+                else:
+                    url = storage.url(file_name)
+                    data[name] = request.build_absolute_uri(url) if request is not None else url
+        if self.finalize is not None:
+            data = self.finalize(data)
+        return data
+
+
+class ValuesSerializer:
+    """
+    只读的快速序列化：按 DRF ModelSerializer 的字段定义预编译一次（按类缓存），
+    之后直接从 .values() 读取的字典行生成数据，不创建模型实例、不逐行实例化序列化器，
+    输出（以及渲染后的 JSON）与原序列化器完全一致
+    """
+
+    def __init__(self, serializer_class, context=None):
+        if serializer_class not in _plans:
+            _plans[serializer_class] = _Plan(serializer_class(), serializer_class.Meta.model, '')
+        self.plan = _plans[serializer_class]
+        self.context = context or {}
+
+    def values(self, queryset):
+        """转换为只读取所需列的 values 查询集"""
+        return queryset.prefetch_related(None).values(*self.plan.columns)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        related = {}
+        self.plan.fetch_many(rows, related)
+        request = self.context.get('request')
+        return [self.plan.build(row, related, request) for row in rows]
+
+
+class ValuesListModelMixin:
+    """
+    用 ValuesSerializer 代替 ListModelMixin.list，视图的 list 序列化器需为 ModelSerializer
+    """
+
+    def list(self, request, *args, **kwargs):
+        fast = ValuesSerializer(self.get_serializer_class(), context=self.get_serializer_context())
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.to_representation(page))
+
+        return Response(fast.to_representation(queryset))
+
+
+class ExportModelMixin:
+    """
+    管理员导出：GET {prefix}/export/ 返回全部（经过滤的）记录组成的 JSON 数组。
+    按主键分批查询、分批序列化，用 StreamingJSONResponse 逐块写出，内存占用与记录数无关
+    """
+    export_serializer_class = None
+    export_chunk_size = 1000
+
+    def get_export_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        fast = ValuesSerializer(self.export_serializer_class or self.get_serializer_class(),
+                                context=self.get_serializer_context())
+        chunks = iter_chunks(fast.values(self.get_export_queryset()), self.export_chunk_size)
+        return StreamingJSONResponse((fast.to_representation(rows) for rows in chunks),
+                                     filename=f'{self.basename}.json')
@@ -0,0 +1,163 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from utils.cache import is_shared_cache
+from utils.singleton import per_process
+
+
+class WorkerIdLease:
+    """
+    从共享缓存租用 worker id（0 ~ max_worker_id）：cache.add 只在 key 不存在时写入，
+    redis、memcached 上是原子操作，同一时刻一个 worker id 只会被一个进程持有。
+    租约 timeout 秒后过期，使用期间每隔 timeout / 3 续期；进程退出后租约过期，worker id 可被新进程复用
+    """
+    KEY = 'order_sn:worker:{}'
+    CURSOR_KEY = 'order_sn:worker:cursor'
+
+    def __init__(self, max_worker_id, timeout=60):
+        self.max_worker_id = max_worker_id
+        self.timeout = timeout
+        self.owner = uuid.uuid4().hex
+        self.worker_id = None
+        self._expires = 0
+        self._renew_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """当前持有的 worker id，到续期时间时续期或重新租用"""
+        if time.monotonic() >= self._renew_at:
+            with self._lock:
+                if time.monotonic() >= self._renew_at:
+                    self._renew()
+        return self.worker_id
+
+    def _renew(self):
+        start = time.monotonic()
+        key = self.KEY.format(self.worker_id)
+        # 租约剩余时间还有 1/3 以上时才续期，确保续期前 key 不会过期、被其他进程占用；
+        # 长时间未使用的进程重新租用
+        if not (self.worker_id is not None and start < self._expires - self.timeout / 3
+                and cache.get(key) == self.owner and cache.touch(key, self.timeout)):
+            self.worker_id = self._acquire()
+        self._expires = start + self.timeout
+        self._renew_at = start + self.timeout / 3
+
+    def _acquire(self):
+        # 从上次分配的位置之后开始尝试，新进程不会都去抢同一个 id，刚过期的 id 也不会马上被复用
+        cache.add(self.CURSOR_KEY, 0, None)
+        try:
+            start = cache.incr(self.CURSOR_KEY)
+        except ValueError:
+            start = 0
+        size = self.max_worker_id + 1
+        for i in range(size):
+            worker_id = (start + i) % size
+            if cache.add(self.KEY.format(worker_id), self.owner, self.timeout):
+                return worker_id
+        raise RuntimeError(f'没有空闲的 worker id，同时运行的进程数超过了 {size}')
+
+
+class SnowflakeGenerator:
+    """
+    Snowflake 风格的订单号生成器，64 位整数：
+        41 位毫秒时间戳（相对 epoch） | 10 位 worker id | 12 位毫秒内序列号
+    同一进程内单调递增；不同进程使用不同的 worker id 即可保证全局唯一
+    worker_id 为整数（固定）或 WorkerIdLease（每次生成前确认租约，续期失败时换用新的 id）
+    """
+    WORKER_ID_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+    SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+    # 2022-01-01 00:00:00 UTC，毫秒
+    EPOCH = 1640995200000
+
+    def __init__(self, worker_id, epoch=EPOCH):
+        self.lease = None
+        if isinstance(worker_id, WorkerIdLease):
+            self.lease, worker_id = worker_id, worker_id.get()
+        self._set_worker_id(worker_id)
+        self.epoch = epoch
+        self._last_ts = -1
+        self._sequence = 0
+        # 临界区只有几次整数运算，锁几乎无竞争
+        self._lock = threading.Lock()
+
+    def _set_worker_id(self, worker_id):
+        if not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f'worker_id 必须在 0~{self.MAX_WORKER_ID} 之间')
+        self.worker_id = worker_id
+        self._worker_part = worker_id << self.SEQUENCE_BITS
+
+    def _now(self):
+        return time.time_ns() // 1000000 - self.epoch
+
+    def next_id(self):
+        with self._lock:
+            if self.lease is not None and self.lease.get() != self.worker_id:
+                self._set_worker_id(self.lease.worker_id)
+            ts = self._now()
+            if ts < self._last_ts:
+                # 时钟回拨时沿用上一次的时间戳，保证单调
+                ts = self._last_ts
+
+            if ts == self._last_ts:
+                self._sequence = (self._sequence + 1) & self.SEQUENCE_MASK
+                if self._sequence == 0:
+                    # 当前毫秒序列号用尽，等到下一毫秒
+                    while ts <= self._last_ts:
+                        ts = self._now()
+            else:
+                self._sequence = 0
+
+            self._last_ts = ts
+            return (ts << (self.WORKER_ID_BITS + self.SEQUENCE_BITS)) | self._worker_part | self._sequence
+
+    def __call__(self):
+        return str(self.next_id())
+
+
+@per_process(settings=('ORDER_SN_GENERATOR', 'ORDER_SN_WORKER_ID'))
+def get_order_sn_generator():
+    """
+    获取当前进程的订单号生成器，类由 ORDER_SN_GENERATOR 配置
+    ORDER_SN_WORKER_ID 未配置时从共享缓存租用 worker id（见 WorkerIdLease）
+    """
+    worker_id = settings.ORDER_SN_WORKER_ID
+    if worker_id is None:
+        if not is_shared_cache():
+            raise ImproperlyConfigured('CACHES 为进程内缓存时无法分配各进程不同的 worker id，'
+                                       '请为每个进程配置不同的 ORDER_SN_WORKER_ID')
+        worker_id = WorkerIdLease(SnowflakeGenerator.MAX_WORKER_ID)
+    return import_string(settings.ORDER_SN_GENERATOR)(worker_id)
+
+
+def _generate(args):
+    worker_id, count = args
+    generator = SnowflakeGenerator(worker_id)
+    return [generator.next_id() for _ in range(count)]
+
+
+if __name__ == '__main__':
+    # 在 apps 目录下执行：python -m utils.order_sn
+    from multiprocessing import Pool
+
+    total = 1000000
+    generator = SnowflakeGenerator(1)
+    start = time.perf_counter()
+    ids = [generator.next_id() for _ in range(total)]
+    elapsed = time.perf_counter() - start
+    assert ids == sorted(ids) and len(set(ids)) == total
+    print(f'单进程：{total} 个，{total / elapsed:,.0f} 个/秒')
+
+    with Pool(4) as pool:
+        results = pool.map(_generate, [(worker_id, 200000) for worker_id in range(4)])
+    merged = [i for result in results for i in result]
+    assert len(set(merged)) == len(merged)
+    print(f'4 进程：{len(merged)} 个，无重复')
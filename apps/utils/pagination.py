@@ -0,0 +1,143 @@
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor, PageNumberPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    键集（游标）分页：按 (排序字段, id) 组合定位上一页的最后一条记录，
+    用 WHERE 条件代替 OFFSET，第 1000 页和第 1 页的查询开销相同
+
+    ordering 的最后一个字段必须唯一（一般为 id）
+    请求参数：
+        cursor：游标，由 next / previous 链接给出
+        ordering：排序字段，取值需在视图的 ordering_fields 中，例如 -sold_num
+        count：为 0 或 false 时不返回 count，省去一次 COUNT(*)（默认与页码分页一样返回）
+        page：兼容按页码翻页的旧客户端，带 page 参数时改用 PageNumberPagination（OFFSET 分页，深翻页变慢）
+    """
+    ordering = ('-add_time', '-id')
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+    page_query_param = 'page'
+
+    # 带 page 参数时使用的页码分页
+    page_number_pagination = None
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering and ordering.lstrip('-') in getattr(view, 'ordering_fields', ()):
+            # 用同方向的 id 打破并列
+            return ordering, '-id' if ordering.startswith('-') else 'id'
+        return tuple(self.ordering)
+
+    def get_position(self, instance):
+        """记录（模型实例或 values() 字典）在排序字段上的取值，编码进游标"""
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return json.dumps(position)
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        (a, b) 在 (x, y) 之后：a > x OR (a = x AND b > y)，降序字段用 <
+        另加冗余条件 a >= x，数据库据此在 (a, b) 索引上直接定位，否则 OR 条件会从头扫描索引，深页变慢
+        """
+        try:
+            values = json.loads(position)
+            values = [self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                      for field, value in zip(ordering, values, strict=True)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        keyset, equal = Q(), {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = ordering[0]
+        bound = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': values[0]})
+        return bound & keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        if self.page_query_param in request.query_params:
+            self.page_number_pagination = PageNumberPagination()
+            ordering = self.get_ordering(request, queryset, view)
+            return self.page_number_pagination.paginate_queryset(queryset.order_by(*ordering), request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.count = None
+        if request.query_params.get(self.count_query_param) not in ('0', 'false'):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request)
+        self.cursor = cursor
+        reverse = cursor is not None and cursor.reverse
+
+        # 向前翻页时反转排序方向，取出后再翻转回来
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+        else:
+            ordering = list(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        fields = getattr(queryset, '_fields', None)
+        if fields:
+            # values() 查询集需包含排序字段，用于生成游标
+            missing = [field.lstrip('-') for field in ordering if field.lstrip('-') not in fields]
+            if missing:
+                queryset = queryset.values(*fields, *missing)
+        if cursor is not None and cursor.position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, cursor.position))
+
+        # 多取一条判断是否还有下一页
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
+
+    def get_paginated_response(self, data):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def to_html(self):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.to_html()
+        return super().to_html()
@@ -0,0 +1,76 @@
+import time
+
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+def get_client_ip(request):
+    """
+    请求方 IP，与 DRF 限流相同：部署在反向代理之后时按 REST_FRAMEWORK 的 NUM_PROXIES
+    从 X-Forwarded-For 末尾取代理前的地址，为 0 时使用 REMOTE_ADDR
+    """
+    return BaseThrottle().get_ident(request)
+
+
+class SlidingWindowRateLimiter:
+    """
+    滑动窗口限流（滑动窗口计数器）：
+    当前窗口计数 + 上一窗口计数 × 上一窗口在滑动窗口内的占比，超过 limit 则拒绝
+    计数使用 cache.add / cache.incr，在 locmem、redis、memcached 上都是原子操作
+    """
+
+    def __init__(self, prefix, limit, window):
+        """
+        :param prefix: 缓存 key 前缀
+        :param limit: 窗口内允许的次数
+        :param window: 窗口长度（秒）
+        """
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+
+    def _key(self, identity, index):
+        return f'ratelimit:{self.prefix}:{identity}:{index}'
+
+    def _incr(self, key):
+        # 两个窗口之后计数不再使用
+        cache.add(key, 0, timeout=self.window * 2)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # add 与 incr 之间 key 恰好过期
+            cache.add(key, 0, timeout=self.window * 2)
+            return cache.incr(key)
+
+    def hit(self, identity):
+        """
+        记录一次请求
+        :param identity: 限流对象，例如手机号、IP
+        :return: 是否允许
+        """
+        now = time.time()
+        index = int(now // self.window)
+        current_key = self._key(identity, index)
+
+        current = self._incr(current_key)
+        previous = cache.get(self._key(identity, index - 1), 0)
+        weight = 1 - (now % self.window) / self.window
+        if previous * weight + current > self.limit:
+            # 被拒绝的请求不计入
+            cache.decr(current_key)
+            return False
+        return True
+
+
+class IntervalRateLimiter:
+    """
+    最小间隔限流：interval 秒内只允许一次，基于原子的 cache.add，
+    适合“60s 只能发一次”这类 limit 为 1 的场景（滑动窗口计数在 limit 为 1 时误差过大）
+    """
+
+    def __init__(self, prefix, interval):
+        self.prefix = prefix
+        self.interval = interval
+
+    def hit(self, identity):
+        return cache.add(f'ratelimit:{self.prefix}:{identity}', 1, timeout=self.interval)
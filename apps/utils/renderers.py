@@ -0,0 +1,69 @@
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# datetime 等交给 DRF 的 JSONEncoder 处理，保持与 JSONRenderer 相同的格式（毫秒精度、UTC 写作 Z）
+_encoder_default = encoders.JSONEncoder().default
+
+
+def dumps(data):
+    """
+    按 JSONRenderer 的默认配置（UNICODE_JSON、COMPACT_JSON、STRICT_JSON）编码为 UTF-8 字节串，
+    安装了 orjson 时用 orjson，否则用标准库 json
+    """
+    if orjson is not None:
+        ret = orjson.dumps(data, default=_encoder_default,
+                           option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    else:
+        ret = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False,
+                         allow_nan=False, separators=(',', ':')).encode()
+    # 与 JSONRenderer 一致，转义 U+2028、U+2029，兼容 JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    用 orjson 编码的 JSONRenderer，输出相同，
+    请求了缩进或修改了 UNICODE_JSON / COMPACT_JSON / STRICT_JSON 时退回 JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or not self.compact or not self.strict \
+                or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def stream_json_list(chunks):
+    """把分块产生的列表编码为一个 JSON 数组，每块编码一次、写出一次"""
+    yield b'['
+    first = True
+    for items in chunks:
+        if not items:
+            continue
+        encoded = dumps(items)
+        # 去掉每块自身的 [ ]，块之间以逗号连接
+        yield encoded[1:-1] if first else b',' + encoded[1:-1]
+        first = False
+    yield b']'
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """分块写出的 JSON 数组响应，chunks 为列表的迭代器"""
+
+    def __init__(self, chunks, filename=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(stream_json_list(chunks), **kwargs)
+        if filename:
+            self['Content-Disposition'] = f'attachment; filename="{filename}"'
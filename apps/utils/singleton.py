@@ -0,0 +1,55 @@
+import functools
+import os
+import threading
+
+from django.core.signals import setting_changed
+
+
+class PerProcess:
+    """
+    每个进程一个的实例：第一次调用时用 factory() 创建，之后返回同一个；
+    fork 出的子进程重新创建（后台线程、线程池、数据库连接不会被 fork 继承）。
+    settings 中的配置修改后（例如测试中的 override_settings）丢弃当前实例，下次调用时按新配置创建，
+    丢弃前调用 on_reset(实例) 释放线程池等资源
+    """
+
+    def __init__(self, factory, settings=(), on_reset=None):
+        functools.update_wrapper(self, factory)
+        self.factory = factory
+        self.settings = frozenset(settings)
+        self.on_reset = on_reset
+        self._instance = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if self.settings:
+            setting_changed.connect(self._setting_changed, weak=False)
+
+    def __call__(self):
+        pid = os.getpid()
+        instance = self._instance
+        if instance is None or self._pid != pid:
+            with self._lock:
+                if self._instance is None or self._pid != pid:
+                    self._instance, self._pid = self.factory(), pid
+                instance = self._instance
+        return instance
+
+    def reset(self):
+        """丢弃当前进程的实例"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self.on_reset is not None and self._pid == os.getpid():
+            self.on_reset(instance)
+
+    def _setting_changed(self, setting, **kwargs):
+        if setting in self.settings:
+            self.reset()
+
+
+def per_process(settings=(), on_reset=None):
+    """
+    装饰器：被装饰的函数创建实例，调用时返回当前进程的实例（见 PerProcess）
+    :param settings: 修改后需要重新创建实例的配置名
+    :param on_reset: 丢弃实例前调用 on_reset(实例)
+    """
+    return lambda factory: PerProcess(factory, settings, on_reset)
@@ -0,0 +1,99 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from utils.singleton import per_process
+from utils.yunpian import YunPian
+
+logger = logging.getLogger(__name__)
+
+
+class SmsTransportError(Exception):
+    """网关暂时不可用（网络错误、超时等），可以重试"""
+
+
+class BaseSmsTransport:
+    """短信发送通道"""
+
+    def send(self, code, mobile):
+        """
+        发送验证码
+        :return: (是否成功, 网关返回信息)，网络等临时错误抛出 SmsTransportError
+        """
+        raise NotImplementedError
+
+
+class YunPianTransport(BaseSmsTransport):
+    """云片网"""
+
+    def __init__(self):
+        self.yun_pian = YunPian(settings.APIKEY)
+
+    def send(self, code, mobile):
+        try:
+            sms_status = self.yun_pian.send_sms(code=code, mobile=mobile)
+        except Exception as e:
+            raise SmsTransportError(str(e)) from e
+        return sms_status['code'] == 0, sms_status.get('msg', '')
+
+
+class StubTransport(BaseSmsTransport):
+    """本地调试、测试用：不发送短信，只记录"""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, code, mobile):
+        self.outbox.append((mobile, code))
+        return True, '发送成功'
+
+
+class SmsDispatcher:
+    """
+    短信后台发送队列：线程池限制并发数，临时错误按指数退避重试，
+    发送结束后调用 callback(code, mobile, success, msg)
+    """
+
+    def __init__(self, transport, max_workers=4, max_retries=3, backoff=0.5):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sms')
+
+    def submit(self, code, mobile, callback=None):
+        """提交发送任务，立即返回 Future"""
+        return self.executor.submit(self._send, code, mobile, callback)
+
+    def _send(self, code, mobile, callback):
+        success, msg = False, ''
+        for attempt in range(self.max_retries + 1):
+            try:
+                success, msg = self.transport.send(code, mobile)
+                break
+            except SmsTransportError as e:
+                msg = str(e)
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        if not success:
+            logger.warning('短信发送失败 mobile=%s msg=%s', mobile, msg)
+
+        if callback is not None:
+            try:
+                callback(code, mobile, success, msg)
+            except Exception:
+                logger.exception('短信发送回调失败 mobile=%s', mobile)
+            finally:
+                # 回调在线程池中访问数据库，释放失效的连接
+                close_old_connections()
+        return success, msg
+
+
+@per_process(settings=('SMS_TRANSPORT', 'SMS_DISPATCHER', 'APIKEY'),
+             on_reset=lambda dispatcher: dispatcher.executor.shutdown(wait=False))
+def get_sms_dispatcher():
+    """获取当前进程的短信发送队列，发送通道由 SMS_TRANSPORT 配置"""
+    return SmsDispatcher(import_string(settings.SMS_TRANSPORT)(), **settings.SMS_DISPATCHER)
@@ -0,0 +1,28 @@
+import os
+import tempfile
+from unittest import SkipTest
+
+from django.db import connection
+
+# 测试使用进程内缓存，不读写部署的 redis
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'mxshop-tests'}}
+
+# 进程间共享的缓存
+FILE_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                           'LOCATION': os.path.join(tempfile.gettempdir(), 'mxshop-tests')}}
+
+# 多进程测试需要进程间共享的缓存，使用测试数据库中的缓存表（需先执行 createcachetable）
+DATABASE_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'tests_cache'}}
+
+
+class SharedDatabaseMixin:
+    """
+    需要其他线程、进程通过各自的连接访问测试数据库的用例：内存中的 SQLite 测试数据库不支持，跳过。
+    在 setUpClass 中判断，此时连接已指向测试数据库（导入模块时还是配置中的数据库）
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest('内存中的 SQLite 测试数据库无法被其他连接共享，需配置 DATABASES TEST NAME 为文件')
+        super().setUpClass()
@@ -0,0 +1,170 @@
+import datetime
+import os
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from utils.db.pool import ConnectionPool, PoolTimeout, _get_pools
+from utils.db.sqlite3.base import DatabaseWrapper
+from utils.renderers import FastJSONRenderer, stream_json_list
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        options = {'size': 1, 'max_overflow': 0, 'timeout': 0.05, 'pre_ping': False, **kwargs}
+        return ConnectionPool(FakeConnection, lambda conn: conn.closed, **options)
+
+    def test_reuse(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['connects'], 1)
+
+    def test_timeout(self):
+        pool = self.make_pool()
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_overflow(self):
+        """高峰时最多 size + max_overflow 个连接，归还时空闲连接超过 size 的关闭"""
+        pool = self.make_pool(max_overflow=1)
+        first, second = pool.acquire(), pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['in_use'], stats['idle'], stats['discarded']), (0, 1, 1))
+
+    def test_recycle(self):
+        pool = self.make_pool(recycle=0.01)
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.02)
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['connects'], 2)
+
+    def test_pre_ping(self):
+        pool = self.make_pool(pre_ping=True)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_discard(self):
+        """丢弃的连接关闭，并让出连接数，等待的请求可以新建连接"""
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.discard(conn)
+        self.assertTrue(conn.closed)
+        self.assertIsNot(pool.acquire(), conn)
+        stats = pool.stats()
+        self.assertEqual((stats['in_use'], stats['idle'], stats['discarded']), (1, 0, 1))
+
+
+class PooledDatabaseWrapperTest(SimpleTestCase):
+    """使用连接池的数据库后端（ConnectionManagementMixin），连接一个临时的 SQLite 文件数据库"""
+    alias = 'pool_tests'
+
+    def setUp(self):
+        fd, name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, name)
+        settings_dict = {**connection.settings_dict, 'NAME': name, 'CONN_HEALTH_CHECKS': True,
+                         'POOL': {'SIZE': 1, 'MAX_OVERFLOW': 0, 'TIMEOUT': 1}}
+        self.wrapper = DatabaseWrapper(settings_dict, self.alias)
+        self.addCleanup(self.close_pool)
+
+    def close_pool(self):
+        self.wrapper.close()
+        pool = _get_pools().pop(self.alias, None)
+        if pool is not None:
+            for conn, _ in pool._idle:
+                conn.close()
+
+    def test_release_on_close(self):
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.get_pool().stats()['idle'], 1)
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, conn)
+
+    def test_rollback_on_release(self):
+        """未提交的事务回滚后再归还"""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE pool_test (id integer)')
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO pool_test VALUES (1)')
+        self.wrapper.close()
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM pool_test')
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_discard_broken(self):
+        """健康检查失败的连接丢弃，不放回连接池"""
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        self.wrapper.health_check_done = False
+        with mock.patch.object(self.wrapper, 'is_broken', return_value=True):
+            self.wrapper.ensure_connection()
+        self.assertIsNot(self.wrapper.connection, conn)
+        stats = self.wrapper.get_pool().stats()
+        self.assertEqual((stats['in_use'], stats['idle'], stats['discarded'], stats['connects']), (1, 0, 1, 2))
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """FastJSONRenderer 与 DRF JSONRenderer 的输出逐字节一致（orjson 与标准库 json 两种实现）"""
+    data = {
+        'price': Decimal('12.50'),
+        'add_time': datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        'local_time': timezone.make_aware(datetime.datetime(2024, 1, 2, 3, 4, 5), timezone.get_fixed_timezone(480)),
+        'naive_time': datetime.datetime(2024, 1, 2, 3, 4, 5, 123),
+        'date': datetime.date(2024, 1, 2),
+        'name': '新鲜水果 🍎',
+        'separator': 'a\u2028b\u2029c',
+        'nested': [{'id': 1, 'ok': True, 'none': None, 'ratio': 0.5}],
+        1: 'int key',
+    }
+
+    def test_equivalent(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        with mock.patch('utils.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_indent(self):
+        # 请求了缩进时退回 JSONRenderer
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(self.data, media_type),
+                         JSONRenderer().render(self.data, media_type))
+
+    def test_stream_json_list(self):
+        chunks = [[{'price': Decimal('1.5')}], [], [{'name': '苹果'}, {'id': 2}]]
+        self.assertEqual(b''.join(stream_json_list(iter(chunks))),
+                         JSONRenderer().render([item for items in chunks for item in items]))
+        self.assertEqual(b''.join(stream_json_list(iter([]))), b'[]')
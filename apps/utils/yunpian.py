@@ -1,26 +1,177 @@
+import logging
+import threading
+import time
+
 import requests
-import json
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """熔断中，暂不请求网关"""
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求，
+    之后放行一次试探请求（半开），成功则关闭，失败则继续打开
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError('短信网关熔断中')
+            # 半开：放行当前请求，其余请求在结果返回前继续被拒绝
+            self._opened_at = time.monotonic()
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
 
 
 class YunPian:
-    def __init__(self, api_key):
+    """
+    云片网短信接口，使用共享的连接池（keep-alive），带超时和熔断
+    """
+    single_send_url = "https://sms.yunpian.com/v2/sms/single_send.json"
+    batch_send_url = "https://sms.yunpian.com/v2/sms/batch_send.json"
+
+    # 批量发送每次请求最多的手机号个数（云片限制 1000）
+    batch_size = 1000
+
+    def __init__(self, api_key, timeout=(3, 5), pool_maxsize=10, base_url=None, circuit_breaker=None):
         self.api_key = api_key
-        self.single_send_url = "https://sms.yunpian.com/v2/sms/single_send.json"
+        # (连接超时, 读超时)，单位秒
+        self.timeout = timeout
+        if base_url:
+            self.single_send_url = f"{base_url}/v2/sms/single_send.json"
+            self.batch_send_url = f"{base_url}/v2/sms/batch_send.json"
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _post(self, url, params):
+        """
+        请求网关，返回网关的 JSON 结果。
+        网络错误、超时、5xx 说明网关不可用，计入熔断并抛出异常（调用方可重试）；
+        4xx 是网关拒绝了这次请求（手机号格式错误、余额不足、频率超限等），原样返回结果，重试也不会成功
+        """
+        self.circuit_breaker.before_call()
+        try:
+            response = self.session.post(url, data=params, timeout=self.timeout)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except requests.RequestException:
+            self.circuit_breaker.on_failure()
+            raise
+
+        try:
+            re_dict = response.json()
+        except ValueError:
+            if response.status_code >= 400:
+                self.circuit_breaker.on_success()
+                return {'code': response.status_code, 'msg': response.text[:200]}
+            # 200 但不是 JSON，按网关故障处理
+            self.circuit_breaker.on_failure()
+            raise
+        self.circuit_breaker.on_success()
+        return re_dict
+
+    @staticmethod
+    def code_text(code):
+        return f"【Hubery_Jun 生鲜超市】您的验证码是 {code}，1 分钟有效。如非本人操作，请忽略本短信"
 
     def send_sms(self, code, mobile):
+        """发送验证码"""
         # 需要传递的参数
         params = {
             "apikey": self.api_key,
             "mobile": mobile,
-            "text": f"【Hubery_Jun 生鲜超市】您的验证码是 {code}，1 分钟有效。如非本人操作，请忽略本短信"
+            "text": self.code_text(code)
         }
-        print(params)
-        response = requests.post(self.single_send_url, data=params)
-        print(response.status_code, response.text)
-        re_dict = json.loads(response.text)
+        re_dict = self._post(self.single_send_url, params)
+        logger.info('短信发送 mobile=%s code=%s msg=%s', mobile, re_dict.get('code'), re_dict.get('msg'))
         return re_dict
 
+    def batch_send(self, text, mobiles):
+        """
+        相同内容批量发送，每 batch_size 个手机号一次请求
+        :param text: 短信内容（需与云片审核通过的模板匹配）
+        :param mobiles: 手机号列表
+        :return: 每次请求网关返回的结果列表
+        """
+        results = []
+        for i in range(0, len(mobiles), self.batch_size):
+            params = {
+                "apikey": self.api_key,
+                "mobile": ",".join(mobiles[i:i + self.batch_size]),
+                "text": text
+            }
+            results.append(self._post(self.batch_send_url, params))
+        logger.info('短信批量发送 %d 个手机号，%d 次请求', len(mobiles), len(results))
+        return results
+
 
 if __name__ == '__main__':
-    yun_pian = YunPian("9b11127a9701975c734b8aee81ee3526")
-    yun_pian.send_sms("2022", "15555151447")
+    # 本地模拟网关，对比每次新建连接与连接池（keep-alive）的耗时
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            body = json.dumps({"code": 0, "msg": "发送成功"}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    total = 500
+
+    start = time.perf_counter()
+    for _ in range(total):
+        requests.post(f'{base_url}/v2/sms/single_send.json', data={"mobile": "15555151447"}).json()
+    no_pool = time.perf_counter() - start
+
+    yun_pian = YunPian("test", base_url=base_url)
+    start = time.perf_counter()
+    for _ in range(total):
+        yun_pian.send_sms("2022", "15555151447")
+    pooled = time.perf_counter() - start
+    print(f'单条发送 {total} 次：新建连接 {total / no_pool:,.0f} 次/秒，连接池 {total / pooled:,.0f} 次/秒')
+
+    mobiles = [f'155{i:08d}' for i in range(10000)]
+    start = time.perf_counter()
+    results = yun_pian.batch_send(YunPian.code_text("2022"), mobiles)
+    print(f'批量发送 {len(mobiles)} 个手机号：{len(results)} 次请求，{time.perf_counter() - start:.3f}s')
+    server.shutdown()